@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Measures the memory used by GUI components.
+
+Builds a tree of about 10,000 components (containers holding plain components,
+texts, images and buttons) and reports the Python heap bytes per component.
+Surface pixels are allocated by SDL and are not part of the figures.
+
+Run from the repository root:
+
+    python benchmarks/component_memory.py [count] [--baseline REVISION]
+
+With --baseline, the same tree is also built with pyos.py as of the given git
+revision, and both figures are reported. Use the initial commit (69326cc) to
+compare against the original tree; a later revision, such as the commit before
+components got __slots__, isolates the effect of a single change.
+"""
+
+from __future__ import print_function
+
+import gc
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# PYOS_PATH points at another copy of pyos.py, used to measure a baseline revision.
+sys.path.insert(0, os.environ.get("PYOS_PATH", ROOT))
+os.chdir(ROOT)
+
+import pygame
+import pyos
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# In revisions before pyos imported the builtins module on Python 3, pyos.__builtin__ is the builtins dict when pyos
+# is imported as a module, and setting attributes on it fails. Point it at the module, so those revisions can be
+# measured as baselines.
+if isinstance(pyos.__builtin__, dict):
+    pyos.__builtin__ = builtins
+
+GUI = pyos.GUI
+
+
+class BenchmarkApplication(object):
+    """The minimum an application needs to provide for components to compute their dimensions."""
+
+    parameters = {}
+    name = "benchmark"
+    title = "Benchmark"
+
+    def __init__(self):
+        self.ui = GUI.AppContainer(self)
+
+
+def build_tree(count):
+    # type: (int) -> tuple
+    """Builds a container tree of about count components, returning it with the exact number of components."""
+    icon = pygame.Surface((1, 1), pygame.SRCALPHA)
+    root = GUI.Container((0, 0), width=240, height=320)
+    built = 1
+    while built < count:
+        group = GUI.Container((0, 0), width=240, height=40)
+        built += 1
+        for index in range(24):
+            kind = index % 4
+            if kind == 0:
+                group.add_child(GUI.Component((index, 0), width=1, height=1))
+                built += 1
+            elif kind == 1:
+                group.add_child(GUI.Text((index, 0), "label"))
+                built += 1
+            elif kind == 2:
+                group.add_child(GUI.Image((index, 0), surface=icon, width=1, height=1))
+                built += 1
+            else:
+                group.add_child(GUI.Button((index, 0), "ok", width=10, height=10))
+                built += 2
+        root.add_child(group)
+    return root, built
+
+
+def measure(count):
+    # type: (int) -> tuple
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tree, built = build_tree(count)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tree, built, after - before
+
+
+def run(count):
+    # type: (int) -> tuple
+    """Measures the pyos module on sys.path, returning the number of components and the bytes they use."""
+    state = pyos.State()
+    pyos.__builtin__.state = state
+    state.active_application = BenchmarkApplication()
+    # Warm up the shared caches, so they are not counted as component memory.
+    build_tree(100)
+    tree, built, used = measure(count)
+    return built, used
+
+
+def run_baseline(revision, count):
+    # type: (str, int) -> tuple
+    """Measures pyos.py as of a git revision in a separate interpreter, returning the same figures as run."""
+    source = subprocess.check_output(["git", "show", "{}:pyos.py".format(revision)], cwd=ROOT)
+    directory = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(directory, "pyos.py"), "wb") as module_file:
+            module_file.write(source)
+        # pyos resolves its resources next to the module.
+        for name in ("apps", "res", "temp"):
+            os.symlink(os.path.join(ROOT, name), os.path.join(directory, name))
+        environment = dict(os.environ, PYOS_PATH=directory)
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__), str(count), "--raw"],
+                                         cwd=ROOT, env=environment)
+    finally:
+        shutil.rmtree(directory)
+    built, used = output.decode().split()[-2:]
+    return int(built), int(used)
+
+
+def report(label, built, used):
+    # type: (str, int, int) -> None
+    print("{}: {} components, {:.1f} KiB, {:.0f} bytes per component".format(label, built, used / 1024.0,
+                                                                          float(used) / built))
+
+
+def main():
+    arguments = sys.argv[1:]
+    baseline = None
+    if "--baseline" in arguments:
+        index = arguments.index("--baseline")
+        baseline = arguments[index + 1]
+        del arguments[index:index + 2]
+    raw = "--raw" in arguments
+    if raw:
+        arguments.remove("--raw")
+    count = int(arguments[0]) if arguments else 10000
+    if tracemalloc is None:
+        print("This benchmark needs the tracemalloc module (Python 3.4 or later).")
+        return
+    built, used = run(count)
+    if raw:
+        print(built, used)
+        return
+    if baseline is not None:
+        base_built, base_used = run_baseline(baseline, count)
+        report("baseline ({})".format(baseline), base_built, base_used)
+    report("current", built, used)
+    if baseline is not None:
+        print("change: {:+.1f}% per component".format(
+            100.0 * (float(used) / built - float(base_used) / base_built) / (float(base_used) / base_built)))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,17 +15,24 @@ import sys
 import pygame
 import json
 import os
+import threading
+import multiprocessing
 import apps
 from types import ModuleType
 from importlib import import_module
 from zipfile import ZipFile
 from shutil import rmtree
-from traceback import format_exc
-from copy import deepcopy
+from traceback import format_exc, format_exception, format_exception_only, format_stack
 from collections import namedtuple
 from collections import OrderedDict
+from collections import deque
+from bisect import bisect_right
 from datetime import datetime
+from datetime import timedelta
+from heapq import heappush, heappop
+import weakref
 import ast
+import pickle
 
 try:
     import pygame.freetype
@@ -34,18 +41,25 @@ except ImportError:
     has_ft = False
     pygame.freetype = None
 
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
 major, minor, micro, rl, sr = sys.version_info
 
 if major == 2:
     from thread import start_new_thread
+    from Queue import Queue, Empty
     import __builtin__
     from __builtin__ import staticmethod
 
 else:
     unicode = str
     raw_input = input
-    __builtin__ = globals()['__builtins__']
+    import builtins as __builtin__
     from threading import _start_new_thread as start_new_thread
+    from queue import Queue, Empty
 
 COMMON_EXCEPTIONS = (ArithmeticError, AttributeError, BufferError, EOFError, LookupError, NameError, OSError,
                      RuntimeError, TypeError, ValueError)
@@ -191,11 +205,14 @@ TaskPauseState = namedtuple("TaskPauseState", "false true toggle".split())(0, 1,
 ThrEvt = namedtuple("ThrEvt", "on_start on_stop on_pause on_resume on_custom".split())(
     "onStart", "onStop", "onPause", "onResume", "onCustom")
 
+# A namedtuple enumerating the thread scheduling priorities, highest first.
+ThreadPriority = namedtuple("ThreadPriority", "foreground system background".split())(0, 1, 2)
+
 
 class Thread(object):
     """Represents an OS thread.
 
-    Serves as base for ``Task``, ``StagedTask``, ``TimedTask`` and ``ParallelTask``.
+    Serves as base for ``Task``, ``StagedTask``, ``GeneratorTask``, ``TimedTask`` and ``ParallelTask``.
     """
 
     def __init__(self, method, **data):
@@ -215,6 +232,11 @@ class Thread(object):
         self.stop = False  # type: bool
         self.first_run = True  # type: bool
         self.method = method  # type: callable
+        self.priority = data.pop("priority", ThreadPriority.system)  # type: int
+        # Runs per second, or None to run on every frame.
+        self.tick_rate = data.pop("tickRate", None)  # type: int
+        self.next_tick = 0  # type: int
+        self.last_run = 0  # type: int
         self.event_bindings.update(data)
 
     @staticmethod
@@ -269,6 +291,32 @@ class Thread(object):
         self.stop = True
         self.exec_event(ThrEvt.on_stop)
 
+    def get_run_delay(self):
+        # type: () -> Union[int, None]
+        """Returns how many milliseconds are left before this thread has work to do on the UI loop.
+        :return: 0 if it must run on the next frame, None if it does not need to run until something wakes the loop.
+        """
+        if self.stop or self.pause:
+            return None
+        if self.method is Application.dummy and not self.first_run:
+            # Applications without a main method only need their first run, which fires the start event.
+            return None
+        if self.tick_rate:
+            return max(0, self.next_tick - pygame.time.get_ticks())
+        return 0
+
+    def tick(self, now):
+        # type: (int) -> None
+        """Records a run started by the Controller at the given time, and works out when the next one is due.
+        :param now: the pygame.time.get_ticks() time of the run.
+        """
+        self.last_run = now
+        if self.tick_rate:
+            period = 1000 // self.tick_rate
+            self.next_tick += period
+            if self.next_tick <= now:
+                self.next_tick = now + period
+
     def run(self):
         # type: () -> None
         """Executes this thread.
@@ -359,29 +407,650 @@ class StagedTask(Task):
             self.set_stop()
 
 
+class GeneratorTask(Task):
+    """Represents a long task written as a generator, which runs a slice at a time over several frames.
+
+    Each frame, the generator is resumed until SLICE_BUDGET milliseconds have passed, checking the time whenever it
+    yields; so it should yield often, e.g. once per item processed. The last yielded value is kept in progress.
+    """
+
+    # Milliseconds of each frame the task may run for.
+    SLICE_BUDGET = 5
+
+    def __init__(self, method, *additional_data):
+        # type: (callable, ...) -> None
+        """GeneratorTask instance initializer.
+        :param method: a generator function, or a generator object.
+        :param additional_data: the arguments for the generator function. Optional.
+        """
+        super(GeneratorTask, self).__init__(method, *additional_data)
+        self.generator = None  # type: Generator
+        self.progress = None  # type: Any
+        self.slice_budget = GeneratorTask.SLICE_BUDGET  # type: int
+        # Called with the latest yielded value after each slice, e.g. to update a progress bar.
+        self.on_progress = None  # type: callable
+
+    def run(self):
+        # type: () -> None
+        """Runs a slice of this task.
+        :return: None.
+        """
+        if self.generator is None:
+            self.generator = self.method(*self.additional_data) if callable(self.method) else self.method
+        deadline = pygame.time.get_ticks() + self.slice_budget
+        try:
+            while True:
+                self.progress = next(self.generator)
+                if pygame.time.get_ticks() >= deadline:
+                    break
+        except StopIteration as finished:
+            self.returned_data = getattr(finished, "value", None)
+            self.set_stop()
+        if self.on_progress is not None:
+            self.on_progress(self.progress)
+
+
 class TimedTask(Task):
     """Represents a task the executes after a time interval.
+
+    The Controller keeps timed tasks apart from the other threads, and only runs them when their deadline is reached.
+    Call set_stop() to cancel one.
     """
 
     def __init__(self, execute_on, method, *additional_data):
-        # type: (time, callable, ...) -> None
+        # type: (datetime, callable, ...) -> None
+        """TimedTask instance initializer.
+        :param execute_on: the datetime to execute the task on.
+        :param method: the task to execute.
+        :param additional_data: data related to the task. Optional.
+        """
         self.execution_time = execute_on
+        # The execution time in pygame.time.get_ticks() milliseconds, so later wall-clock changes do not affect it.
+        self.deadline = pygame.time.get_ticks() + max(0, int((execute_on - datetime.now()).total_seconds() * 1000))
         super(TimedTask, self).__init__(method, *additional_data)
 
     def run(self):
         # type: () -> None
-        """Run this task.
+        """Run this task, if its deadline was reached.
         :return: None.
         """
-        delta = self.execution_time - datetime.now()
-        if delta.total_seconds() <= 0:
-            super(TimedTask, self).run()
+        if pygame.time.get_ticks() >= self.deadline:
+            self.fire()
 
+    def fire(self):
+        # type: () -> None
+        """Executes this task; called by the Controller at the deadline.
+        """
+        super(TimedTask, self).run()
 
-class ParallelTask(Task):
-    """Represents a python thread.
+    def get_run_delay(self):
+        # type: () -> Union[int, None]
+        """Returns how many milliseconds are left before the execution time.
+        """
+        if self.stop:
+            return None
+        return max(0, self.deadline - pygame.time.get_ticks())
+
+
+class PeriodicTask(TimedTask):
+    """Represents a task that executes repeatedly, at a fixed interval, until it is stopped.
+    """
+
+    def __init__(self, interval, method, *additional_data):
+        # type: (int, callable, ...) -> None
+        """PeriodicTask instance initializer.
+        :param interval: the milliseconds between executions; the first one happens after an interval.
+        :param method: the task to execute.
+        :param additional_data: data related to the task. Optional.
+        """
+        self.interval = interval  # type: int
+        super(PeriodicTask, self).__init__(datetime.now() + timedelta(milliseconds=interval), method,
+                                           *additional_data)
+
+    def fire(self):
+        # type: () -> None
+        """Executes this task and moves its deadline to the next interval.
+        """
+        self.returned_data = self.method(*self.additional_data)
+        # Skip the intervals that were missed, instead of running them all at once.
+        now = pygame.time.get_ticks()
+        self.deadline += self.interval * max(1, (now - self.deadline) // self.interval + 1)
+
+
+class Future(object):
+    """Represents the result of a work item submitted to a WorkerPool.
 
-    Warning: This starts a new thread.
+    Callbacks added with add_done_callback are called on the UI loop, never on the worker thread.
+    """
+
+    PENDING = 0
+    RUNNING = 1
+    DONE = 2
+    CANCELLED = 3
+
+    def __init__(self, method, additional_data=(), owner=None):
+        # type: (callable, tuple, Any) -> None
+        """Future instance initializer.
+        :param method: the work to perform.
+        :param additional_data: the arguments for method.
+        :param owner: the application the work belongs to, if any.
+        """
+        self.method = method  # type: callable
+        self.additional_data = additional_data  # type: tuple
+        self.owner = owner  # type: Application
+        self.status = Future.PENDING  # type: int
+        self.returned_data = None  # type: Any
+        self.exception = None  # type: Exception
+        self.traceback = None  # type: str
+        self.callbacks = []  # type: list
+        self.submit_time = pygame.time.get_ticks()  # type: int
+        self.start_time = None  # type: int
+        self.end_time = None  # type: int
+        # What cancel() must also cancel, when the work runs elsewhere (e.g. a concurrent.futures.Future).
+        self.handle = None  # type: Any
+        self._finished = threading.Event()
+
+    def done(self):
+        # type: () -> bool
+        """Returns whether the work finished or was cancelled.
+        """
+        return self.status in (Future.DONE, Future.CANCELLED)
+
+    def cancelled(self):
+        # type: () -> bool
+        """Returns whether the work was cancelled.
+        """
+        return self.status == Future.CANCELLED
+
+    def cancel(self):
+        # type: () -> bool
+        """Cancels the work. Work that already started runs to the end, but its result is dropped.
+        :return: False if the work had already finished.
+        """
+        if self.status == Future.DONE:
+            return False
+        self.status = Future.CANCELLED
+        if self.handle is not None:
+            self.handle.cancel()
+        self._finished.set()
+        return True
+
+    def result(self, timeout=None):
+        # type: (float) -> Any
+        """Returns the value returned by the work, waiting for it up to timeout seconds.
+
+        Do not wait on the UI loop; use add_done_callback there.
+        :return: the returned value, or None if the work failed, was cancelled or did not finish in time.
+        """
+        self._finished.wait(timeout)
+        return self.returned_data
+
+    def add_done_callback(self, callback):
+        # type: (callable) -> None
+        """Calls callback(future) on the UI loop once the work has finished.
+        """
+        self.callbacks.append(callback)
+
+    def execute(self):
+        # type: () -> None
+        """Performs the work; called on a worker thread.
+        """
+        self.start_time = pygame.time.get_ticks()
+        self.status = Future.RUNNING
+        try:
+            returned_data = self.method(*self.additional_data)
+        # Any failure in the work is reported to the callbacks instead of killing the worker.
+        except Exception as error:
+            self.exception = error
+            self.traceback = format_exc()
+            returned_data = None
+        self.end_time = pygame.time.get_ticks()
+        if self.status == Future.RUNNING:
+            self.returned_data = returned_data
+            self.status = Future.DONE
+        self._finished.set()
+
+
+class CompletionQueue(object):
+    """Represents the finished work of a pool, waiting for its Future callbacks to run on the UI loop.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        """CompletionQueue instance initializer.
+        """
+        self.completed = deque()  # type: deque
+        self.finished = 0  # type: int
+        self.failed = 0  # type: int
+        self.cancelled = 0  # type: int
+        self.total_wait = 0  # type: int
+        self.total_run = 0  # type: int
+
+    def put(self, future):
+        # type: (Future) -> None
+        """Queues finished or cancelled work and wakes the UI loop; called from any thread.
+        """
+        self.completed.append(future)
+        state.gui.wake()
+
+    def has_completed(self):
+        # type: () -> bool
+        """Returns whether finished work is waiting for its callbacks.
+        """
+        return len(self.completed) > 0
+
+    def dispatch(self):
+        # type: () -> None
+        """Calls the callbacks of the finished work; called on the UI loop.
+        """
+        while len(self.completed) > 0:
+            future = self.completed.popleft()
+            if future.cancelled():
+                self.cancelled += 1
+            else:
+                self.finished += 1
+                self.total_wait += future.start_time - future.submit_time
+                self.total_run += future.end_time - future.start_time
+                if future.exception is not None:
+                    self.failed += 1
+            for callback in future.callbacks:
+                try:
+                    callback(future)
+                except COMMON_EXCEPTIONS:
+                    State.error_recovery("Task callback error.", str(future.method))
+
+    def stats(self):
+        # type: () -> dict
+        """Gets the completion counters; wait and run times are averages in milliseconds.
+        """
+        return {"finished": self.finished, "failed": self.failed, "cancelled": self.cancelled,
+                "average_wait": self.total_wait // max(self.finished, 1),
+                "average_run": self.total_run // max(self.finished, 1)}
+
+
+class WorkerPool(object):
+    """Represents a bounded set of worker threads, started as work arrives.
+    """
+
+    def __init__(self, max_workers=4):
+        # type: (int) -> None
+        """WorkerPool instance initializer.
+        :param max_workers: the most threads running work at the same time.
+        """
+        self.max_workers = max_workers  # type: int
+        self.workers = []  # type: list
+        self.idle_workers = 0  # type: int
+        self.pending = Queue()  # type: Queue
+        self.completion = CompletionQueue()  # type: CompletionQueue
+        self.submitted = 0  # type: int
+        self.max_queue_depth = 0  # type: int
+        self._lock = threading.Lock()
+
+    def submit(self, method, additional_data=(), owner=None):
+        # type: (callable, tuple, Any) -> Future
+        """Queues work to run on a worker thread.
+        :param method: the work to perform.
+        :param additional_data: the arguments for method.
+        :param owner: the application the work belongs to; see cancel_owner().
+        :return: the Future of the work.
+        """
+        future = Future(method, additional_data, owner)
+        with self._lock:
+            self.submitted += 1
+            self.pending.put(future)
+            self.max_queue_depth = max(self.max_queue_depth, self.pending.qsize())
+            if self.pending.qsize() > self.idle_workers and len(self.workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name="WorkerPool-" + str(len(self.workers)))
+                worker.daemon = True
+                self.workers.append(worker)
+                self.idle_workers += 1
+                worker.start()
+        return future
+
+    def _work(self):
+        # type: () -> None
+        """Worker thread body: runs queued work until the pool is shut down.
+        """
+        while True:
+            future = self.pending.get()
+            if future is None:
+                return
+            if future.cancelled():
+                self.completion.put(future)
+                continue
+            with self._lock:
+                self.idle_workers -= 1
+            future.execute()
+            with self._lock:
+                self.idle_workers += 1
+            self.completion.put(future)
+
+    def cancel_owner(self, owner):
+        # type: (Any) -> None
+        """Cancels the work of an application, e.g. when it is closed.
+        """
+        with self._lock:
+            pending = list(self.pending.queue)
+        for future in pending:
+            if future is not None and future.owner is owner:
+                future.cancel()
+
+    def has_completed(self):
+        # type: () -> bool
+        """Returns whether finished work is waiting for its callbacks.
+        """
+        return self.completion.has_completed()
+
+    def dispatch_completed(self):
+        # type: () -> None
+        """Calls the callbacks of the finished work; called on the UI loop.
+        """
+        self.completion.dispatch()
+
+    def stats(self):
+        # type: () -> dict
+        """Gets the pool counters; wait and run times are averages in milliseconds.
+        """
+        stats = {"workers": len(self.workers), "busy": len(self.workers) - self.idle_workers,
+                 "queue_depth": self.pending.qsize(), "max_queue_depth": self.max_queue_depth,
+                 "submitted": self.submitted}
+        stats.update(self.completion.stats())
+        return stats
+
+    def shutdown(self):
+        # type: () -> None
+        """Cancels the queued work and stops the workers once they are done with the current one.
+        """
+        with self._lock:
+            pending = list(self.pending.queue)
+        for future in pending:
+            if future is not None:
+                future.cancel()
+        for _ in self.workers:
+            self.pending.put(None)
+        self.workers = []
+        self.idle_workers = 0
+
+
+def run_in_process(method, additional_data):
+    # type: (callable, tuple) -> tuple
+    """Runs work sent to a ProcessPool, in the child process.
+    :return: a (returned data, traceback) pair; the traceback is None on success.
+    """
+    try:
+        returned_data = method(*additional_data)
+        if major == 2:
+            # Python 2's pool has no error_callback, so a result that cannot be sent back must fail here.
+            pickle.dumps(returned_data, pickle.HIGHEST_PROTOCOL)
+        return returned_data, None
+    # Any failure is sent back as text, since the exception itself may not be picklable.
+    except Exception:
+        return None, format_exc()
+
+
+class ProcessPool(object):
+    """Represents a pool of worker processes for CPU-bound work, started on the first submit.
+
+    Work and its arguments and results must be picklable: module-level functions and plain data. Images can be
+    passed as raw pixel buffers, see ProcessTask.surface_to_buffer. Finished work is delivered like the
+    WorkerPool's, through Future callbacks on the UI loop.
+
+    The processes are started fresh (forkserver or spawn) rather than forked, since the UI process holds SDL state
+    and running threads that a forked child would inherit in an inconsistent state.
+    """
+
+    def __init__(self, max_workers=None):
+        # type: (int) -> None
+        """ProcessPool instance initializer.
+        :param max_workers: the number of processes; by default, one less than the number of cores.
+        """
+        if max_workers is None:
+            try:
+                max_workers = max(1, multiprocessing.cpu_count() - 1)
+            except NotImplementedError:
+                max_workers = 1
+        self.max_workers = max_workers  # type: int
+        self.pool = None  # type: multiprocessing.pool.Pool
+        self.in_flight = []  # type: list
+        self.completion = CompletionQueue()  # type: CompletionQueue
+        self.submitted = 0  # type: int
+        self.max_queue_depth = 0  # type: int
+        self._lock = threading.Lock()
+
+    def submit(self, method, additional_data=(), owner=None):
+        # type: (callable, tuple, Any) -> Future
+        """Queues work on the process pool, starting the processes if needed.
+        :param method: the work to perform; a module-level function.
+        :param additional_data: the arguments for method.
+        :param owner: the application the work belongs to; see cancel_owner().
+        :return: the Future of the work.
+        """
+        future = Future(method, additional_data, owner)
+        with self._lock:
+            if self.pool is None:
+                self.pool = ProcessPool.get_context().Pool(self.max_workers)
+            self.submitted += 1
+            self.in_flight.append(future)
+            self.max_queue_depth = max(self.max_queue_depth, len(self.in_flight))
+        future.status = Future.RUNNING
+        future.start_time = future.submit_time
+        callbacks = {"callback": lambda result: self._finish(future, result)}
+        if major > 2:
+            # Called when the work, its arguments or its result cannot be pickled.
+            callbacks["error_callback"] = lambda error: self._finish(future, None, error)
+        else:
+            # Python 2's pool has no error_callback and drops work it cannot pickle, so check it up front.
+            try:
+                pickle.dumps((method, additional_data), pickle.HIGHEST_PROTOCOL)
+            except Exception as error:
+                self._finish(future, None, error)
+                return future
+        self.pool.apply_async(run_in_process, (method, additional_data), **callbacks)
+        return future
+
+    @staticmethod
+    def get_context():
+        # type: () -> Any
+        """Returns the multiprocessing context the processes are started with.
+        """
+        if major == 2:
+            return multiprocessing
+        methods = multiprocessing.get_all_start_methods()
+        return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+    def _finish(self, future, result, error=None):
+        # type: (Future, tuple, BaseException) -> None
+        """Records the result of some work, or the error that kept it from being sent; called on the pool's result
+        thread.
+        """
+        future.end_time = pygame.time.get_ticks()
+        if future.status == Future.RUNNING:
+            if error is not None:
+                future.exception = error
+                future.traceback = "".join(format_exception_only(type(error), error))
+            else:
+                future.returned_data, future.traceback = result
+                if future.traceback is not None:
+                    future.exception = RuntimeError(future.traceback.strip().splitlines()[-1])
+            future.status = Future.DONE
+        future._finished.set()
+        with self._lock:
+            self.in_flight.remove(future)
+        self.completion.put(future)
+
+    def cancel_owner(self, owner):
+        # type: (Any) -> None
+        """Cancels the work of an application; the processes finish it, but its results are dropped.
+        """
+        with self._lock:
+            in_flight = self.in_flight[:]
+        for future in in_flight:
+            if future.owner is owner:
+                future.cancel()
+
+    def has_completed(self):
+        # type: () -> bool
+        """Returns whether finished work is waiting for its callbacks.
+        """
+        return self.completion.has_completed()
+
+    def dispatch_completed(self):
+        # type: () -> None
+        """Calls the callbacks of the finished work; called on the UI loop.
+        """
+        self.completion.dispatch()
+
+    def stats(self):
+        # type: () -> dict
+        """Gets the pool counters; wait and run times are averages in milliseconds.
+        """
+        workers = 0 if self.pool is None else self.max_workers
+        stats = {"workers": workers, "busy": min(len(self.in_flight), workers), "queue_depth": len(self.in_flight),
+                 "max_queue_depth": self.max_queue_depth, "submitted": self.submitted}
+        stats.update(self.completion.stats())
+        return stats
+
+    def shutdown(self):
+        # type: () -> None
+        """Terminates the processes, which start again on the next submit, dropping the results of running work.
+        """
+        with self._lock:
+            pool = self.pool
+            self.pool = None
+            in_flight = self.in_flight[:]
+        for future in in_flight:
+            future.cancel()
+        if pool is not None:
+            pool.terminate()
+
+
+class AsyncLoop(object):
+    """Represents an asyncio event loop running in a helper thread, for I/O-bound work.
+
+    Many coroutines waiting on I/O share the one thread. Their results are delivered like the WorkerPool's, through
+    Future callbacks on the UI loop. Needs Python 3; on Python 2 submit() raises RuntimeError.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        """AsyncLoop instance initializer.
+        """
+        self.loop = None  # type: asyncio.AbstractEventLoop
+        self.in_flight = []  # type: list
+        self.completion = CompletionQueue()  # type: CompletionQueue
+        self.submitted = 0  # type: int
+        self.max_queue_depth = 0  # type: int
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        # type: () -> bool
+        """Returns whether asyncio can be used.
+        """
+        return asyncio is not None
+
+    def submit(self, coroutine, additional_data=(), owner=None):
+        # type: (Any, tuple, Any) -> Future
+        """Schedules a coroutine on the event loop, starting the loop if needed.
+        :param coroutine: the coroutine object to run.
+        :param additional_data: not used; coroutines already hold their arguments.
+        :param owner: the application the work belongs to; see cancel_owner().
+        :return: the Future of the coroutine.
+        """
+        if asyncio is None:
+            raise RuntimeError("asyncio is not available on this Python version.")
+        future = Future(coroutine, (), owner)
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._work, name="AsyncLoop", args=(self.loop,))
+                thread.daemon = True
+                thread.start()
+            self.submitted += 1
+            self.in_flight.append(future)
+            self.max_queue_depth = max(self.max_queue_depth, len(self.in_flight))
+        future.status = Future.RUNNING
+        future.start_time = future.submit_time
+        future.handle = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        future.handle.add_done_callback(lambda handle: self._finish(future, handle))
+        return future
+
+    def _work(self, loop):
+        # type: (asyncio.AbstractEventLoop) -> None
+        """Helper thread body: runs the event loop until shutdown() stops it.
+        """
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+        loop.close()
+
+    def _finish(self, future, handle):
+        # type: (Future, Any) -> None
+        """Records the result of a coroutine; called on the event loop thread.
+        """
+        future.end_time = pygame.time.get_ticks()
+        if future.status == Future.RUNNING and not handle.cancelled():
+            error = handle.exception()
+            if error is None:
+                future.returned_data = handle.result()
+            else:
+                future.exception = error
+                future.traceback = "".join(format_exception(type(error), error, error.__traceback__))
+            future.status = Future.DONE
+        elif future.status == Future.RUNNING:
+            future.status = Future.CANCELLED
+        future._finished.set()
+        with self._lock:
+            self.in_flight.remove(future)
+        self.completion.put(future)
+
+    def cancel_owner(self, owner):
+        # type: (Any) -> None
+        """Cancels the coroutines of an application, e.g. when it is closed.
+        """
+        with self._lock:
+            in_flight = self.in_flight[:]
+        for future in in_flight:
+            if future.owner is owner:
+                future.cancel()
+
+    def has_completed(self):
+        # type: () -> bool
+        """Returns whether finished coroutines are waiting for their callbacks.
+        """
+        return self.completion.has_completed()
+
+    def dispatch_completed(self):
+        # type: () -> None
+        """Calls the callbacks of the finished coroutines; called on the UI loop.
+        """
+        self.completion.dispatch()
+
+    def stats(self):
+        # type: () -> dict
+        """Gets the loop counters; wait and run times are averages in milliseconds.
+        """
+        stats = {"workers": 0 if self.loop is None else 1, "busy": len(self.in_flight),
+                 "queue_depth": len(self.in_flight), "max_queue_depth": self.max_queue_depth,
+                 "submitted": self.submitted}
+        stats.update(self.completion.stats())
+        return stats
+
+    def shutdown(self):
+        # type: () -> None
+        """Cancels the coroutines and stops the loop, which starts again on the next submit.
+        """
+        with self._lock:
+            loop = self.loop
+            self.loop = None
+            in_flight = self.in_flight[:]
+        for future in in_flight:
+            future.cancel()
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+class ParallelTask(Task):
+    """Represents a task that runs on a worker thread of the Controller's pool.
     """
 
     def __init__(self, method, *additional_data):
@@ -391,6 +1060,10 @@ class ParallelTask(Task):
         """
         super(ParallelTask, self).__init__(method, *additional_data)
         self.ran = False  # type: bool
+        self.future = None  # type: Future
+        # The application that created the task, whose work is cancelled when it is closed. Tasks created while the
+        # State itself is being built have no owner.
+        self.owner = state.active_application if hasattr(__builtin__, "state") else None  # type: Application
 
     def run(self):
         # type: () -> None
@@ -398,38 +1071,101 @@ class ParallelTask(Task):
         :return: None.
         """
         if not self.ran:
-            start_new_thread(self.run_helper, ())
+            self.future = self.get_pool().submit(self.method, self.additional_data, self.owner)
+            self.future.add_done_callback(self.on_done)
             self.ran = True
 
-    def get_return(self):
-        return None
+    def get_pool(self):
+        # type: () -> WorkerPool
+        """Returns the pool the task runs on.
+        """
+        return state.thread_controller.worker_pool
 
-    def run_helper(self):
-        # type: () -> None
-        """Task execution helper.
-        :return: None.
+    def on_done(self, future):
+        # type: (Future) -> None
+        """Records the result of the task; called on the UI loop.
         """
-        self.method(*self.additional_data)
+        if future.traceback is not None:
+            print(future.traceback)
+        self.returned_data = future.returned_data
+        if self in state.thread_controller.data_requests:
+            state.thread_controller.data_requests[self] = self.returned_data
         self.set_stop()
 
+    def get_run_delay(self):
+        # type: () -> Union[int, None]
+        """Returns 0 until the task is submitted; afterwards its completion wakes the UI loop.
+        """
+        if self.ran or self.stop:
+            return None
+        return 0
+
     def set_stop(self):
         # type: () -> None
-        """Stop this task.
+        """Stop this task, cancelling it if it has not started yet.
         :return: None.
         """
+        if self.future is not None and not self.future.done():
+            self.future.cancel()
         super(ParallelTask, self).set_stop()
 
 
+class ProcessTask(ParallelTask):
+    """Represents a CPU-bound task that runs in a process of the Controller's pool, so it does not hold the GIL.
+
+    The method must be a module-level function, and its arguments and result must be picklable.
+    """
+
+    def get_pool(self):
+        # type: () -> ProcessPool
+        """Overrides ParallelTask.get_pool.
+        """
+        return state.thread_controller.process_pool
+
+    @staticmethod
+    def surface_to_buffer(surface):
+        # type: (pygame.Surface) -> tuple
+        """Returns the pixels of a surface as picklable data, to pass an image to a process.
+        :return: a (RGBA bytes, (width, height)) pair.
+        """
+        return pygame.image.tostring(surface, "RGBA"), surface.get_size()
+
+    @staticmethod
+    def buffer_to_surface(pixel_buffer):
+        # type: (tuple) -> pygame.Surface
+        """Returns a surface from data made by surface_to_buffer.
+        """
+        pixels, size = pixel_buffer
+        return pygame.image.fromstring(pixels, size, "RGBA")
+
+
 class Controller(object):
     """Represents a thread/task controller.
+
+    Each frame, the threads that are due run by priority (the foreground application, then the system, then
+    the background applications), and the least recently run first within a priority. Once FRAME_BUDGET is spent,
+    the remaining system and background threads are deferred to the next frame; the foreground one always runs.
+    Each priority still runs at least one thread per frame, its least recently run, so a busy foreground
+    application cannot starve the others: deferred threads take turns.
     """
 
+    # Milliseconds of a frame the threads may use before the lower priority ones are deferred.
+    FRAME_BUDGET = 12
+    # The most ParallelTasks running at the same time.
+    MAX_WORKERS = 4
+
     def __init__(self):
         # type: () -> None
         """Controller instance initializer.
         """
         self.threads = []
         self.data_requests = {}
+        self.worker_pool = WorkerPool(Controller.MAX_WORKERS)  # type: WorkerPool
+        self.process_pool = ProcessPool()  # type: ProcessPool
+        self.async_loop = AsyncLoop()  # type: AsyncLoop
+        # Heap of (deadline, sequence, TimedTask); stopped tasks are dropped when they reach the top.
+        self.timers = []  # type: list
+        self._timer_counter = 0  # type: int
 
     def request_data(self, from_thread, default=None):
         # type: (str, Any) -> None
@@ -454,7 +1190,41 @@ class Controller(object):
         :param thread: the thread or task to add.
         :return: None.
         """
-        self.threads.append(thread)
+        if isinstance(thread, TimedTask):
+            self.schedule(thread)
+        else:
+            self.threads.append(thread)
+
+    def schedule(self, task):
+        # type: (TimedTask) -> None
+        """Queues a timed task to run at its deadline.
+        :param task: the task to schedule.
+        """
+        self._timer_counter += 1
+        heappush(self.timers, (task.deadline, self._timer_counter, task))
+
+    def get_next_deadline(self):
+        # type: () -> Union[int, None]
+        """Returns the pygame.time.get_ticks() deadline of the next timed task, or None if there is none.
+        """
+        while self.timers and self.timers[0][2].stop:
+            heappop(self.timers)
+        if not self.timers:
+            return None
+        return self.timers[0][0]
+
+    def run_timers(self):
+        # type: () -> None
+        """Runs the timed tasks whose deadline was reached, and schedules again the periodic ones.
+        """
+        now = pygame.time.get_ticks()
+        while self.timers and self.timers[0][0] <= now:
+            task = heappop(self.timers)[2]
+            if task.stop:
+                continue
+            task.fire()
+            if not task.stop:
+                self.schedule(task)
 
     def remove_thread(self, thread):
         # type: (Thread) -> None
@@ -463,7 +1233,10 @@ class Controller(object):
         :return: None.
         """
         try:
-            if isinstance(thread, int):
+            if isinstance(thread, TimedTask):
+                # Cancelled; it leaves the heap when it reaches the top.
+                thread.stop = True
+            elif isinstance(thread, int):
                 self.threads.pop(thread)
             else:
                 self.threads.remove(thread)
@@ -477,21 +1250,58 @@ class Controller(object):
         """
         for thread in self.threads:
             thread.set_stop()
+        for _, _, task in self.timers:
+            task.set_stop()
+        del self.timers[:]
+        for pool in (self.worker_pool, self.process_pool, self.async_loop):
+            pool.shutdown()
+
+    def get_run_delay(self):
+        # type: () -> Union[int, None]
+        """Returns how many milliseconds are left before any thread has work to do on the UI loop.
+        :return: 0 if a thread must run on the next frame, None if no thread is waiting for time to pass.
+        """
+        for pool in (self.worker_pool, self.process_pool, self.async_loop):
+            if pool.has_completed():
+                return 0
+        delay = None
+        deadline = self.get_next_deadline()
+        if deadline is not None:
+            delay = max(0, deadline - pygame.time.get_ticks())
+        for thread in self.threads:
+            if delay == 0:
+                break
+            thread_delay = thread.get_run_delay()
+            if thread_delay is not None and (delay is None or thread_delay < delay):
+                delay = thread_delay
+        return delay
 
     def run(self):
         # type: () -> None
-        """Runs this controller and all of its threads and tasks.
+        """Runs this controller: the timed tasks that are due, then the threads by priority within FRAME_BUDGET.
         :return: None.
         """
-        for thread in self.threads:
+        for pool in (self.worker_pool, self.process_pool, self.async_loop):
+            pool.dispatch_completed()
+        self.run_timers()
+        now = pygame.time.get_ticks()
+        deadline = now + Controller.FRAME_BUDGET
+        due = [thread for thread in self.threads if thread.get_run_delay() == 0]
+        due.sort(key=lambda t: (t.priority, t.last_run))
+        served = set()
+        for thread in due:
+            if (thread.priority != ThreadPriority.foreground and thread.priority in served and
+                    pygame.time.get_ticks() >= deadline):
+                continue
+            served.add(thread.priority)
+            thread.tick(pygame.time.get_ticks())
             thread.run()
             if thread in self.data_requests:
                 try:
-                    self.data_requests[thread] = thread.getReturn()
+                    self.data_requests[thread] = thread.get_return()
                 except COMMON_EXCEPTIONS:
-                    self.data_requests[thread] = False  # getReturn called on Thread, not Task
-            if thread.stop:
-                self.threads.remove(thread)
+                    self.data_requests[thread] = False  # get_return called on Thread, not Task
+        self.threads = [thread for thread in self.threads if not thread.stop]
 
 # NOTE: new in 1.01 - A namedtuple enumerating checkbox states.
 CheckboxState = namedtuple("CheckboxState", "unchecked checked toggle".split())(0, 1, 2)
@@ -507,6 +1317,17 @@ class GUI(object):
     # NOTE: new in 1.01 - added the DEFAULT_RESOLUTION class constant
     DEFAULT_RESOLUTION = {"width": 240, "height": 320}
 
+    # Fraction of the screen area that, once covered by dirty rects, makes a full flip cheaper.
+    DIRTY_AREA_THRESHOLD = 0.6
+    # Maximum number of dirty rects pushed with a single display update.
+    MAX_DIRTY_RECTS = 32
+    # Longest time, in milliseconds, the loop sleeps while nothing changes.
+    IDLE_TIMEOUT = 1000
+    # Posted to wake the loop when another thread changes the UI.
+    WAKE_EVENT = pygame.USEREVENT + 1
+    # Time, in milliseconds, a frame may spend dispatching input before the rest waits for the next frame.
+    EVENT_BUDGET = 10
+
     def __init__(self):
         # type: () -> None
         """GUI instance initializer.
@@ -515,6 +1336,20 @@ class GUI(object):
         self.orientation = 0  # 0 for portrait, 1 for landscape
         self.timer = None
         self.update_interval = 30
+        self.dirty_rects = []  # type: list
+        self.dirty_area = 0  # type: int
+        self.full_refresh = True  # type: bool
+        self.surface_allocations = 0  # type: int
+        self.frame_surface_allocations = 0  # type: int
+        self.input_latency = 0  # type: int
+        self.max_input_latency = 0  # type: int
+        self.frame_input_latency = 0  # type: int
+        self.main_thread = threading.current_thread()  # type: threading.Thread
+        self.wake_pending = False  # type: bool
+        settings = read_json("res/settings.json", {})
+        self.on_demand = settings.get("on_demand_rendering", True)  # type: bool
+        # Report components changed outside the UI loop's thread; slow, for debugging only.
+        self.debug_threads = settings.get("debug_ui_threads", False)  # type: bool
         pygame.init()
         if __import__("sys").platform == "linux2" and os.path.isdir("/home/pi"):
             pygame.mouse.set_visible(False)
@@ -550,106 +1385,726 @@ class GUI(object):
         self.width = self.height
         self.height = bk
         screen = pygame.display.set_mode((self.width, self.height))
+        self.invalidate()
         for app in state.application_list.application_list:
             app.ui.refresh()
         State.rescue()
 
-    def repaint(self):
-        # type: () -> None
-        """Clears the screen to the background color.
-        :return: None.
-        """
-        screen.fill(state.color_palette.get_color(GUI.Palette.background))
+    def repaint(self):
+        # type: () -> None
+        """Clears the screen to the background color.
+        :return: None.
+        """
+        screen.fill(state.color_palette.get_color(GUI.Palette.background))
+        self.invalidate()
+
+    def invalidate(self, rect=None):
+        # type: (Union[pygame.Rect, tuple, list]) -> None
+        """Marks an area of the screen as changed, so it is pushed to the display on the next refresh.
+
+        Without a rect, the whole screen is marked.
+        :param rect: the changed area, in screen coordinates.
+        """
+        if self.full_refresh:
+            return
+        if rect is None:
+            self.full_refresh = True
+            return
+        rect = pygame.Rect(rect).clip(screen.get_rect())
+        if rect.width == 0 or rect.height == 0:
+            return
+        for dirty in self.dirty_rects:
+            if dirty.contains(rect):
+                return
+        self.dirty_rects.append(rect)
+        self.dirty_area += rect.width * rect.height
+        if (self.dirty_area > self.DIRTY_AREA_THRESHOLD * self.width * self.height or
+                len(self.dirty_rects) > self.MAX_DIRTY_RECTS):
+            self.full_refresh = True
+
+    def refresh(self):
+        # type: () -> None
+        """Updates the display.
+
+        Only the areas reported through invalidate() are pushed, falling back
+        to a full flip when they cover too much of the screen.
+        :return: None.
+        """
+        if self.full_refresh:
+            pygame.display.flip()
+        elif len(self.dirty_rects) > 0:
+            pygame.display.update(self.dirty_rects)
+        self.dirty_rects = []
+        self.dirty_area = 0
+        self.full_refresh = False
+        self.frame_surface_allocations = self.surface_allocations
+        self.surface_allocations = 0
+        self.frame_input_latency = self.max_input_latency
+        self.max_input_latency = 0
+
+    def record_input_latency(self, event):
+        # type: (GUI.Event) -> None
+        """Records how long an input event waited between being queued and being dispatched.
+
+        The latest value is kept in input_latency, and the worst one of the last completed frame in
+        frame_input_latency, both in milliseconds.
+        :param event: the dispatched event.
+        """
+        self.input_latency = pygame.time.get_ticks() - event.time
+        if self.input_latency > self.max_input_latency:
+            self.max_input_latency = self.input_latency
+
+    def wake(self):
+        # type: () -> None
+        """Wakes the main loop if it is waiting for input.
+
+        Called when the UI changes; only changes made from other threads need to post a wake event.
+        """
+        if not self.wake_pending and not self.is_ui_thread():
+            self.wake_pending = True
+            pygame.event.post(pygame.event.Event(GUI.WAKE_EVENT))
+
+    def is_ui_thread(self):
+        # type: () -> bool
+        """Returns whether the caller runs on the UI loop's thread.
+        """
+        return threading.current_thread() is self.main_thread
+
+    def check_thread(self, component):
+        # type: (GUI.Component) -> None
+        """Prints where a component is changed from, if it is not the UI loop's thread.
+
+        Such changes race with rendering; they should go through state.call_soon instead.
+        :param component: the component being changed.
+        """
+        if not self.is_ui_thread():
+            print("UI changed off the UI thread: {} from thread {}".format(type(component).__name__,
+                                                                           threading.current_thread().name))
+            print("".join(format_stack()[:-2]))
+
+    def wait(self, timeout):
+        # type: (int) -> None
+        """Sleeps until an event arrives, another thread wakes the loop, or timeout milliseconds pass.
+        The event that ended the wait is left in the queue.
+        :param timeout: the longest time to sleep, in milliseconds.
+        """
+        try:
+            event = pygame.event.wait(timeout)
+        except TypeError:
+            # pygame 1.x cannot wait with a timeout.
+            end = pygame.time.get_ticks() + timeout
+            while not pygame.event.peek() and pygame.time.get_ticks() < end:
+                pygame.time.wait(10)
+            self.wake_pending = False
+            return
+        self.wake_pending = False
+        if event.type not in (pygame.NOEVENT, GUI.WAKE_EVENT):
+            pygame.event.post(event)
+
+    def create_surface(self, size):
+        # type: (tuple) -> pygame.Surface
+        """Allocates a per-pixel alpha surface for a component, counting it in surface_allocations.
+
+        The count for the last completed frame is kept in frame_surface_allocations.
+        :param size: the surface (width, height).
+        """
+        self.surface_allocations += 1
+        return pygame.Surface(size, pygame.SRCALPHA)
+
+    # NOTE: New in 1.01 - getScreen turned into a property
+    @property
+    def screen(self):
+        # type: () -> pygame.Surface
+        """Gets the display surface.
+        """
+        return screen
+
+    def monitor_fps(self, frame_time=None):
+        # type: (int) -> None
+        """Updates the screen refresh rate.
+        :param frame_time: the milliseconds the last frame spent working. When given, the rate is judged by how
+        fast frames can be produced, so the time spent waiting for input does not count as a slowdown.
+        """
+        if frame_time is None:
+            real = round(self.timer.get_fps())
+        else:
+            real = 1000 // max(frame_time, 1)
+        if real >= self.update_interval and self.update_interval < 30:
+            self.update_interval += 1
+        else:
+            if self.update_interval > 10:
+                self.update_interval -= 1
+
+    # NOTE: New in 1.01 - display_standby_text() turned into a staticmethod.
+    @staticmethod
+    def display_standby_text(text="Stand by...", size=20, color=(20, 20, 20), bgcolor=(100, 100, 200)):
+        # type: (str, int, tuple, tuple) -> None
+        """Renders a small box with a text message.
+        """
+        pygame.draw.rect(screen, bgcolor,
+                         [0, ((state.gui.height - 40) / 2) - size, state.gui.width, 2 * size])
+        screen.blit(state.font.get(size).render(text, 1, color),
+                    (5, ((state.gui.height - 40) / 2) - size + (size / 4)))
+        pygame.display.flip()
+
+    @staticmethod
+    def get_centered_coordinates(component, larger):
+        # type: (Component, Component) -> list
+        """Centers a component inside its container boundaries.
+        :param component: the component to centralize.
+        :param larger: the container to align into.
+        :return: a 2-int list (a position)
+        """
+        return [(larger.computed_width / 2) - (component.computed_width / 2),
+                (larger.computed_height / 2) - (component.computed_height / 2)]
+
+    class Font(object):
+        """Encapsulates the pygame Font class.
+
+        Font objects live in a process-wide registry: each size is created on first
+        use and shared by every Font built from the same file. SDL_ttf and FreeType are
+        not thread-safe, so fonts are only created and used on the UI thread.
+        """
+
+        USAGE_FILE = "temp/fonts.json"
+
+        _registry = {}  # type: dict
+        _registry_lock = threading.Lock()
+        _used = set()  # type: set
+
+        MAX_MEASURED = 4096
+        _widths = {}  # type: dict
+
+        def __init__(self, path="res/RobotoCondensed-Regular.ttf", min_size=10, max_size=30):
+            # type: (str, int, int) -> None
+            """Font instance initializer.
+            :param path: the source TrueType font to use.
+            :param min_size: the minimum font size (sizes are created on first use).
+            :param max_size: the maximum font size (sizes are created on first use).
+            """
+            self.path = path  # type: str
+            self.min_size = min_size  # type: int
+            self.max_size = max_size  # type: int
+
+            self.freetype = None
+            if has_ft:
+                self.freetype = pygame.freetype
+
+        @staticmethod
+        def _load(key):
+            # type: (tuple) -> Union[pygame.Font, freetype.Font]
+            """Creates the font object for a (path, size, freetype) key, unless another caller already did.
+            """
+            with GUI.Font._registry_lock:
+                font = GUI.Font._registry.get(key)
+                if font is None:
+                    path, size, ft = key
+                    if ft:
+                        font = pygame.freetype.Font(path, size)
+                    else:
+                        font = pygame.font.Font(path, size)
+                    GUI.Font._registry[key] = font
+            return font
+
+        def measure(self, text, size=14, ft=False):
+            # type: (str, int, bool) -> int
+            """Returns the width of a piece of text, memoized per font file and size.
+            :param text: the text to measure (usually a single word).
+            :param size: the font size.
+            :param ft: True to measure with freetype, False to use pygame.font.
+            """
+            key = (self.path, size, ft)
+            widths = GUI.Font._widths.get(key)
+            if widths is None:
+                widths = GUI.Font._widths.setdefault(key, {})
+            width = widths.get(text)
+            if width is None:
+                if len(widths) >= GUI.Font.MAX_MEASURED:
+                    widths.clear()
+                font = self.get(size, ft)
+                if ft:
+                    width = font.get_rect(text).width
+                else:
+                    width = font.size(text)[0]
+                widths[text] = width
+            return width
+
+        def line_height(self, size=14, ft=False):
+            # type: (int, bool) -> int
+            """Returns the height of a line of text.
+            :param size: the font size.
+            :param ft: True to measure with freetype, False to use pygame.font.
+            """
+            font = self.get(size, ft)
+            if ft:
+                return font.get_sized_height()
+            return font.get_height()
+
+        def get(self, size=14, ft=False):
+            # type: (int, bool) -> Union[pygame.Font, freetype.Font]
+            """Returns the Font object used for rendering.
+            :param size: the font size.
+            :param ft: True if the font object is a freetype.Font, False if it is a pygame.Font
+            """
+            key = (self.path, size, ft)
+            if key not in GUI.Font._used:
+                with GUI.Font._registry_lock:
+                    GUI.Font._used.add(key)
+            font = GUI.Font._registry.get(key)
+            if font is None:
+                font = GUI.Font._load(key)
+            return font
+
+        @staticmethod
+        def load_usage(path=USAGE_FILE):
+            # type: (str) -> list
+            """Returns the (path, size, freetype) keys recorded by previous sessions.
+            """
+            if not os.path.exists(path):
+                return []
+            try:
+                with open(path) as usage_file:
+                    return [tuple(key) for key in json.load(usage_file)]
+            except COMMON_EXCEPTIONS:
+                return []
+
+        @staticmethod
+        def save_usage(path=USAGE_FILE):
+            # type: (str) -> None
+            """Records the font sizes used in this session, so the next boot can pre-warm them.
+            """
+            with GUI.Font._registry_lock:
+                used = set(GUI.Font._used)
+            keys = set(GUI.Font.load_usage(path)) | used
+            try:
+                with open(path, "w") as usage_file:
+                    json.dump(sorted([list(key) for key in keys]), usage_file)
+            except COMMON_EXCEPTIONS:
+                print("The font usage could not be saved.")
+
+        @staticmethod
+        def prewarm(path=USAGE_FILE):
+            # type: (str) -> Generator
+            """Creates the font sizes recorded by previous sessions, yielding after each one.
+            Meant for a GeneratorTask, so the fonts are created on the UI thread a few at a time.
+            """
+            for key in GUI.Font.load_usage(path):
+                if key not in GUI.Font._registry and (has_ft or not key[2]) and os.path.exists(key[0]):
+                    GUI.Font._load(key)
+                    yield key
+
+    class TextCache(object):
+        """Size-bounded LRU cache of rendered text surfaces, shared by all text components.
+
+        Cached surfaces are shared between callers and must be treated as read-only.
+        """
+
+        def __init__(self, max_bytes=1048576):
+            # type: (int) -> None
+            """TextCache instance initializer.
+            :param max_bytes: the memory budget for cached surfaces, in bytes.
+            """
+            self.max_bytes = max_bytes  # type: int
+            self.size = 0  # type: int
+            self.hits = 0  # type: int
+            self.misses = 0  # type: int
+            self.evictions = 0  # type: int
+            self._surfaces = OrderedDict()  # type: OrderedDict
+
+        @property
+        def stats(self):
+            # type: () -> dict
+            """Gets the cache counters.
+            """
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._surfaces), "bytes": self.size, "max_bytes": self.max_bytes}
+
+        @staticmethod
+        def _surface_bytes(surface):
+            # type: (pygame.Surface) -> int
+            return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+        def render(self, font, size, text, color, use_ft=False):
+            # type: (GUI.Font, int, str, tuple, bool) -> pygame.Surface
+            """Returns the rendered surface for the text, rendering it only on a cache miss.
+            :param font: the GUI.Font to render with.
+            :param size: the font size.
+            :param text: the text to render.
+            :param color: the text color.
+            :param use_ft: True to render with freetype.
+            """
+            key = (font.path, size, use_ft, text, tuple(color))
+            surface = self._surfaces.pop(key, None)
+            if surface is not None:
+                self.hits += 1
+                self._surfaces[key] = surface
+                return surface
+            self.misses += 1
+            if use_ft:
+                surface = font.get(size, True).render(text, color)[0]
+            else:
+                surface = font.get(size).render(text, 1, color)
+            surface_bytes = self._surface_bytes(surface)
+            if surface_bytes <= self.max_bytes:
+                self._surfaces[key] = surface
+                self.size += surface_bytes
+                while self.size > self.max_bytes:
+                    self.size -= self._surface_bytes(self._surfaces.popitem(False)[1])
+                    self.evictions += 1
+            return surface
+
+        def clear(self):
+            # type: () -> None
+            """Removes all cached surfaces.
+            """
+            self._surfaces.clear()
+            self.size = 0
+
+    class AssetCache(object):
+        """Memory-bounded cache of decoded images, keyed by resolved path and target size.
+
+        Surfaces are converted for fast blitting and shared between callers, so they must be treated as
+        read-only. Components keep their own reference to the surfaces they use, so evicting an entry never
+        affects what is already on screen.
+
+        Entries are not reference counted on purpose: eviction only drops the cache's own reference, and the
+        surface stays alive for as long as any component still holds it. Python's reference counting already
+        does what explicit acquire/release calls would, and it cannot be unbalanced by a missed release. The
+        only cost of evicting a surface that is still in use is that the next load of that path decodes a
+        second copy of it.
+        """
+
+        def __init__(self, max_bytes=4194304):
+            # type: (int) -> None
+            """AssetCache instance initializer.
+            :param max_bytes: the memory budget, in bytes.
+            """
+            self.max_bytes = max_bytes  # type: int
+            self.size = 0  # type: int
+            self.hits = 0  # type: int
+            self.misses = 0  # type: int
+            self.evictions = 0  # type: int
+            self._surfaces = OrderedDict()  # type: OrderedDict
+            self._lock = threading.RLock()
+
+        @property
+        def stats(self):
+            # type: () -> dict
+            """Gets the cache counters.
+            """
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._surfaces), "bytes": self.size, "max_bytes": self.max_bytes}
+
+        @staticmethod
+        def _key(path, size=None):
+            # type: (str, tuple) -> tuple
+            return os.path.abspath(path), tuple(size) if size is not None else None
+
+        @staticmethod
+        def _convert(surface):
+            # type: (pygame.Surface) -> pygame.Surface
+            try:
+                return surface.convert_alpha()
+            except pygame.error:
+                # No display mode has been set yet.
+                return surface
+
+        def get(self, path, size=None):
+            # type: (str, tuple) -> pygame.Surface
+            """Returns the image at path, scaled to size, decoding it only on a cache miss.
+            :param path: the image file.
+            :param size: the target (width, height), or None for the image's own size.
+            """
+            key = GUI.AssetCache._key(path, size)
+            with self._lock:
+                surface = self._surfaces.pop(key, None)
+                if surface is not None:
+                    self.hits += 1
+                    self._surfaces[key] = surface
+                    return surface
+                self.misses += 1
+                if size is None:
+                    surface = GUI.AssetCache._convert(pygame.image.load(key[0]))
+                else:
+                    surface = pygame.transform.scale(self.get(path), key[1])
+                self._surfaces[key] = surface
+                self.size += GUI.TextCache._surface_bytes(surface)
+                self._evict()
+                return surface
+
+        def _evict(self):
+            # type: () -> None
+            """Drops least recently used surfaces until the cache fits its budget.
+            """
+            if self.size <= self.max_bytes:
+                return
+            for key in list(self._surfaces.keys()):
+                if self.size <= self.max_bytes:
+                    break
+                self.size -= GUI.TextCache._surface_bytes(self._surfaces.pop(key))
+                self.evictions += 1
+
+        def clear(self):
+            # type: () -> None
+            """Removes all surfaces.
+            """
+            with self._lock:
+                self._surfaces.clear()
+                self.size = 0
+
+    class TimerService(object):
+        """Shared clock that repaints components on a schedule.
+
+        Time-driven components (clocks, carets, timers) register here instead of checking the time on every frame,
+        so they only repaint when their output changes. Components are held through weak references.
+        """
+
+        class Schedule(object):
+            """A pending invalidation of one component.
+            """
+            __slots__ = ('component', 'interval', 'aligned', 'callback', 'method', 'cancelled')
+
+            def __init__(self, component, interval, aligned, callback):
+                # type: (GUI.Component, int, bool, callable) -> None
+                self.component = weakref.ref(component)
+                self.interval = interval  # type: int
+                self.aligned = aligned  # type: bool
+                # Methods of the component itself are kept unbound, so the schedule does not keep it alive.
+                self.method = getattr(callback, "__self__", None) is component
+                self.callback = callback.__func__ if self.method else callback
+                self.cancelled = False  # type: bool
+
+        def __init__(self):
+            # type: () -> None
+            """TimerService instance initializer.
+            """
+            self._heap = []  # type: list
+            self._counter = 0  # type: int
+
+        @staticmethod
+        def get_aligned_delay(interval):
+            # type: (int) -> int
+            """Returns the milliseconds left until the next local wall-clock multiple of interval.
+            """
+            now = datetime.now()
+            elapsed = (now - now.replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds() * 1000
+            return interval - int(elapsed) % interval
+
+        def _push(self, schedule, delay):
+            # type: (GUI.TimerService.Schedule, int) -> None
+            self._counter += 1
+            heappush(self._heap, (pygame.time.get_ticks() + delay, self._counter, schedule))
+
+        def schedule(self, component, delay, interval=None, aligned=False, callback=None):
+            # type: (GUI.Component, int, int, bool, callable) -> GUI.TimerService.Schedule
+            """Schedules a component to be repainted.
+            :param component: the component to repaint.
+            :param delay: the milliseconds before the first repaint.
+            :param interval: the milliseconds between repaints, or None to repaint once.
+            :param aligned: True to repaint on wall-clock multiples of interval.
+            :param callback: called before each repaint, usually to update the component contents.
+            :return: a handle for cancel().
+            """
+            schedule = GUI.TimerService.Schedule(component, interval, aligned, callback)
+            self._push(schedule, delay)
+            return schedule
+
+        def cancel(self, handle=None, component=None):
+            # type: (GUI.TimerService.Schedule, GUI.Component) -> None
+            """Cancels a schedule, or every schedule of a component.
+            """
+            if handle is not None:
+                handle.cancelled = True
+            if component is not None:
+                for _, _, schedule in self._heap:
+                    if schedule.component() is component:
+                        schedule.cancelled = True
+
+        def get_delay(self):
+            # type: () -> Union[int, None]
+            """Returns the milliseconds left before the next repaint, or None if nothing is scheduled.
+            """
+            while self._heap and (self._heap[0][2].cancelled or self._heap[0][2].component() is None):
+                heappop(self._heap)
+            if not self._heap:
+                return None
+            return max(0, self._heap[0][0] - pygame.time.get_ticks())
+
+        def run(self):
+            # type: () -> None
+            """Repaints every component whose time has come, and schedules the next repaint of periodic ones.
+            """
+            now = pygame.time.get_ticks()
+            while self._heap and self._heap[0][0] <= now:
+                schedule = heappop(self._heap)[2]
+                component = schedule.component()
+                if schedule.cancelled or component is None:
+                    continue
+                if schedule.interval is not None:
+                    if schedule.aligned:
+                        self._push(schedule, GUI.TimerService.get_aligned_delay(schedule.interval))
+                    else:
+                        self._push(schedule, schedule.interval)
+                if schedule.callback is not None:
+                    try:
+                        if schedule.method:
+                            schedule.callback(component)
+                        else:
+                            schedule.callback()
+                    except COMMON_EXCEPTIONS:
+                        State.error_recovery("Scheduled invalidation error.", str(component))
+                        schedule.cancelled = True
+                        continue
+                component.mark_dirty()
+
+    class Compositor(object):
+        """Composes the screen from stacked layers.
 
-    def refresh(self):
-        # type: () -> None
-        """Updates the display.
-        :return: None.
+        Every layer root (the application, its dialogs, the function bar, the keyboard and the system overlays) keeps
+        its composed surface between frames and is only composed again when something in it was marked dirty. The
+        screen is then recomposited, bottom to top, only inside the areas reported to GUI.invalidate.
         """
-        pygame.display.flip()
 
-    # NOTE: New in 1.01 - getScreen turned into a property
-    @property
-    def screen(self):
-        # type: () -> pygame.Surface
-        """Gets the display surface.
-        """
-        return screen
+        APP = 0
+        OVERLAY = 1
+        FUNCTION_BAR = 2
+        KEYBOARD = 3
+        SYSTEM = 4
 
-    def monitor_fps(self):
-        # type: () -> None
-        """Updates the screen refresh rate.
-        """
-        real = round(self.timer.get_fps())
-        if real >= self.update_interval and self.update_interval < 30:
-            self.update_interval += 1
-        else:
-            if self.update_interval > 10:
-                self.update_interval -= 1
+        def __init__(self):
+            # type: () -> None
+            """Compositor instance initializer.
+            """
+            self.system_overlays = []  # type: list
+            self._last_sources = []  # type: list
 
-    # NOTE: New in 1.01 - display_standby_text() turned into a staticmethod.
-    @staticmethod
-    def display_standby_text(text="Stand by...", size=20, color=(20, 20, 20), bgcolor=(100, 100, 200)):
-        # type: (str, int, tuple, tuple) -> None
-        """Renders a small box with a text message.
-        """
-        pygame.draw.rect(screen, bgcolor,
-                         [0, ((state.gui.height - 40) / 2) - size, state.gui.width, 2 * size])
-        screen.blit(state.font.get(size).render(text, 1, color),
-                    (5, ((state.gui.height - 40) / 2) - size + (size / 4)))
-        pygame.display.flip()
+        def show_system_overlay(self, container):
+            # type: (GUI.Container) -> None
+            """Adds a container to the topmost layer, above the keyboard.
+            """
+            if container not in self.system_overlays:
+                container.data["screenRoot"] = True
+                self.system_overlays.append(container)
+                container.mark_dirty()
 
-    @staticmethod
-    def get_centered_coordinates(component, larger):
-        # type: (Component, Component) -> list
-        """Centers a component inside its container boundaries.
-        :param component: the component to centralize.
-        :param larger: the container to align into.
-        :return: a 2-int list (a position)
-        """
-        return [(larger.computed_width / 2) - (component.computed_width / 2),
-                (larger.computed_height / 2) - (component.computed_height / 2)]
+        def hide_system_overlay(self, container):
+            # type: (GUI.Container) -> None
+            """Removes a container from the topmost layer.
+            """
+            if container in self.system_overlays:
+                self.system_overlays.remove(container)
+                state.gui.invalidate(container.get_screen_rect())
 
-    class Font(object):
-        """Encapsulates the pygame Font class.
-        """
+        @staticmethod
+        def get_layer(layer):
+            # type: (int) -> list
+            """Returns the layer roots of a layer, bottom to top.
+            :param layer: one of APP, OVERLAY, FUNCTION_BAR, KEYBOARD or SYSTEM.
+            """
+            if layer == GUI.Compositor.APP:
+                return [] if state.active_application is None else [state.active_application.ui]
+            if layer == GUI.Compositor.OVERLAY:
+                if state.active_application is None:
+                    return []
+                return [dialog.base_container for dialog in reversed(state.active_application.ui.dialogs)]
+            if layer == GUI.Compositor.FUNCTION_BAR:
+                return [] if state.function_bar is None else [state.function_bar.container]
+            if layer == GUI.Compositor.KEYBOARD:
+                return [state.keyboard.base_container] if state.keyboard is not None and state.keyboard.active else []
+            return state.compositor.system_overlays[:]
+
+        def get_sources(self):
+            # type: () -> list
+            """Returns every layer root on screen, bottom to top.
+            """
+            sources = []
+            for layer in range(GUI.Compositor.SYSTEM + 1):
+                sources.extend(GUI.Compositor.get_layer(layer))
+            return sources
 
-        def __init__(self, path="res/RobotoCondensed-Regular.ttf", min_size=10, max_size=30):
-            # type: (str, int, int) -> None
-            """Font instance initializer.
-            :param path: the source TrueType font to use.
-            :param min_size: the minimum font size.
-            :param max_size: the maximum font size.
+        @property
+        def dirty(self):
+            # type: () -> bool
+            """Gets whether some layer has to be composed again.
             """
-            self.path = path  # type: str
-            self.sizes = {}  # type: dict
-            self.ft_sizes = {}  # type: dict
-            curr_size = min_size  # type: int
+            for source in self.get_sources():
+                if source.dirty:
+                    return True
+            return False
 
-            self.freetype = None
-            if has_ft:
-                self.freetype = pygame.freetype
+        def compose(self):
+            # type: () -> None
+            """Composes the layer roots that changed since the last frame.
 
-            while curr_size <= max_size:
-                if self.freetype is not None:
-                    self.ft_sizes[curr_size] = self.freetype.Font(path, curr_size)
-                self.sizes[curr_size] = pygame.font.Font(path, curr_size)
-                curr_size += 1
+            A layer root that moved, was resized, or entered or left the screen invalidates the whole screen.
+            """
+            sources = self.get_sources()
+            if sources != self._last_sources:
+                self._last_sources = sources
+                state.gui.invalidate()
+            for source in sources:
+                if source.update_geometry():
+                    state.gui.invalidate()
+                if not source.surface.get_locked():
+                    source.compose()
 
-        def get(self, size=14, ft=False):
-            # type: (int, bool) -> Union[pygame.Font, freetype.Font]
-            """Returns the Font object used for rendering.
-            :param size: the font size.
-            :param ft: True if the font object is a freetype.Font, False if it is a pygame.Font
+        def render(self, surface):
+            # type: (pygame.Surface) -> None
+            """Recomposites the invalidated areas of the screen from the layer surfaces.
+            :param surface: the screen surface.
             """
-            if ft:
-                if size not in self.ft_sizes:
-                    self.ft_sizes[size] = self.freetype.Font(self.path, size)
-                return self.ft_sizes[size]
+            if state.gui.full_refresh:
+                regions = [surface.get_rect()]
             else:
-                if size not in self.sizes:
-                    self.sizes[size] = pygame.font.Font(self.path, size)
-                return self.sizes[size]
+                regions = state.gui.dirty_rects
+            if len(regions) == 0:
+                return
+            sources = [(source.surface, source.get_absolute_position()) for source in self._last_sources]
+            for region in regions:
+                surface.set_clip(region)
+                surface.fill((0, 0, 0))
+                for layer_surface, position in sources:
+                    surface.blit(layer_surface, position)
+            surface.set_clip(None)
+
+    class SpatialIndex(object):
+        """Uniform grid over the rects of a container's children, used to resolve clicks without scanning them all.
+        """
+
+        CELL_SIZE = 64
+
+        def __init__(self, components, cell_size=CELL_SIZE):
+            # type: (list, int) -> None
+            """SpatialIndex instance initializer.
+            :param components: the components to index, in rendering order.
+            :param cell_size: the width and height of a grid cell, in pixels.
+            """
+            self.cell_size = cell_size  # type: int
+            self.components = components  # type: list
+            self.count = len(components)  # type: int
+            self.cells = {}  # type: dict
+            for index, component in enumerate(components):
+                rect = component.rect
+                if rect.width <= 0 or rect.height <= 0:
+                    continue
+                for cell_x in range(rect.left // cell_size, (rect.right - 1) // cell_size + 1):
+                    for cell_y in range(rect.top // cell_size, (rect.bottom - 1) // cell_size + 1):
+                        self.cells.setdefault((cell_x, cell_y), []).append(index)
+
+        def is_valid(self, components):
+            # type: (list) -> bool
+            """Returns whether the index still describes the given component list.
+            """
+            return self.components is components and self.count == len(components)
+
+        def query(self, x, y):
+            # type: (int, int) -> list
+            """Returns the components whose cell contains the point, topmost first.
+            :param x: the horizontal position, relative to the container.
+            :param y: the vertical position, relative to the container.
+            """
+            indices = self.cells.get((int(x) // self.cell_size, int(y) // self.cell_size), ())
+            return [self.components[index] for index in reversed(indices)]
 
     class Icons(object):
         """Represents the icon library.
@@ -697,18 +2152,19 @@ class GUI(object):
 
         def get_loaded_icon(self, icon, folder=""):
             # type: (str, str) -> pygame.Surface
-            """Loads and returns an icon.
+            """Returns an icon from the shared asset cache, loading it on first use.
+            The returned surface is shared and must not be drawn on.
             """
             try:
-                return pygame.image.load(os.path.join(self._root_path, self._icons[icon]))
-            except pygame.error:
-                if os.path.exists(icon):
-                    return pygame.transform.scale(pygame.image.load(icon), (40, 40))
-                if os.path.exists(os.path.join("res/icons/", icon)):
-                    return pygame.transform.scale(pygame.image.load(os.path.join("res/icons/", icon)), (40, 40))
-                if os.path.exists(os.path.join(folder, icon)):
-                    return pygame.transform.scale(pygame.image.load(os.path.join(folder, icon)), (40, 40))
-                return pygame.image.load(os.path.join(self._root_path, self._icons["unknown"]))
+                return state.asset_cache.get(os.path.join(self._root_path, self._icons[icon]))
+            except (KeyError, pygame.error):
+                for path in (icon, os.path.join("res/icons/", icon), os.path.join(folder, icon)):
+                    if os.path.isfile(path):
+                        try:
+                            return state.asset_cache.get(path, (40, 40))
+                        except pygame.error:
+                            pass
+                return state.asset_cache.get(os.path.join(self._root_path, self._icons["unknown"]))
 
         @staticmethod
         def load_from_file(path):
@@ -889,6 +2345,11 @@ class GUI(object):
     class LongClickEvent(Event):
         """Represents a long screen touch or mouse button press.
         """
+        __slots__ = ('intermediate_points', 'mouse_down', 'mouse_down_time', 'mouse_up', 'mouse_up_time', 'path_stride',
+                     'path_skipped', 'pos', 'updated')
+
+        # The most points kept for the path of a gesture; longer paths are decimated.
+        MAX_PATH_POINTS = 64
 
         def __init__(self, mouse_down):
             # type: (pygame.event.Event) -> None
@@ -896,20 +2357,43 @@ class GUI(object):
             :param mouse_down: the corresponding pygame.MOUSEBUTTONDOWN event instance.
             """
             self.mouse_down = mouse_down  # type: pygame.event.Event
-            self.mouse_down_time = datetime.now()  # type: datetime.time
+            self.mouse_down_time = pygame.time.get_ticks()  # type: int
             self.mouse_up = None  # type: pygame.event.Event
-            self.mouse_up_time = None  # type: datetime.time
+            self.mouse_up_time = None  # type: int
             self.intermediate_points = []  # type: list
+            self.path_stride = 1  # type: int
+            self.path_skipped = 0  # type: int
             self.pos = self.mouse_down.pos  # type: tuple
+            self.updated = False  # type: bool
+
+        @property
+        def time(self):
+            # type: () -> int
+            """Gets the pygame.time.get_ticks() timestamp of the press, or of the release once it ended.
+            """
+            return self.mouse_down_time if self.mouse_up_time is None else self.mouse_up_time
 
         def intermediate_update(self, mouse_move):
             # type: (pygame.event.Event) -> None
             """Captures and updates the mouse movement path during a long click event.
+
+            The path holds at most MAX_PATH_POINTS points: when it is full, every other point is dropped and only
+            every other position is sampled from then on, so long drags keep their overall shape with a fixed amount
+            of memory. The last point is always the latest position.
             :param mouse_move: the corresponding pygame.MOUSEMOTION event instance.
             """
-            if self.mouse_up is None and (
-                            len(self.intermediate_points) == 0 or mouse_move.pos != self.intermediate_points[-1]):
-                self.intermediate_points.append(mouse_move.pos)
+            points = self.intermediate_points
+            if self.mouse_up is None and (len(points) == 0 or mouse_move.pos != points[-1]):
+                self.updated = True
+                if len(points) > 1 and self.path_skipped + 1 < self.path_stride:
+                    self.path_skipped += 1
+                    points[-1] = mouse_move.pos
+                    return
+                self.path_skipped = 0
+                if len(points) >= self.MAX_PATH_POINTS:
+                    del points[1::2]
+                    self.path_stride *= 2
+                points.append(mouse_move.pos)
 
         def end(self, mouse_up):
             # type: (pygame.event.Event) -> None
@@ -917,7 +2401,7 @@ class GUI(object):
             :param mouse_up: the corresponding pygame.MOUSEBUTTONUP event instance.
             """
             self.mouse_up = mouse_up
-            self.mouse_up_time = datetime.now()
+            self.mouse_up_time = pygame.time.get_ticks()
             self.pos = self.mouse_up.pos
 
         # NOTE: new in 1.01 - getLatestUpdate() turned into a property.
@@ -938,35 +2422,70 @@ class GUI(object):
             """Checks timestamps against a time interval.
             :param time: the time interval in milliseconds.
             """
-            delta = self.mouse_up_time - self.mouse_down_time
-            return (delta.microseconds / 1000) >= time
+            return self.mouse_up_time - self.mouse_down_time >= time
+
+    class ClickEvent(Event):
+        """Represents a short screen touch or mouse button press.
+        """
+        __slots__ = 'pos', 'source_event', 'time'
+
+        def __init__(self, pos, src, time):
+            # type: (Tuple[int, int], pygame.event.Event, int) -> None
+            """ClickEvent instance initializer.
+            :param pos: the mouse position.
+            :param src: the source pygame.MOUSEBUTTONUP event.
+            :param time: the pygame.time.get_ticks() timestamp of the release.
+            """
+            self.pos = pos  # type: tuple
+            self.source_event = src  # type: pygame.event.Event
+            self.time = time  # type: int
 
     class IntermediateUpdateEvent(Event):
-        """Represents?
+        """Represents the latest position of a press that is still in progress.
         """
         # NOTE: new in 1.01 - __slots__ added, to reduce memory usage.
-        __slots__ = 'pos', 'source_event'
+        __slots__ = 'pos', 'source_event', 'time'
 
-        def __init__(self, pos, src):
-            # type: Tuple[int, int], pygame.event.Event) -> None
+        def __init__(self, pos, src, time=None):
+            # type: (Tuple[int, int], GUI.LongClickEvent, int) -> None
             """IntermediateUpdateEvent instance initializer.
             :param pos: a mouse position.
             :param src: the source event.
+            :param time: the pygame.time.get_ticks() timestamp of the position.
             """
             self.pos = pos  # type: tuple
-            self.source_event = src  # type: pygame.event.Event
+            self.source_event = src  # type: GUI.LongClickEvent
+            self.time = pygame.time.get_ticks() if time is None else time  # type: int
 
     class EventQueue(object):
         """Represents a queue of events to be processed (or handled).
+
+        The queue is a ring buffer of CAPACITY events: when it is full, the oldest events are dropped. Mouse motion
+        is coalesced, so each batch of consecutive motion events only adds its last position to the current press.
         """
         # NOTE: new in 1.01 - __slots__ added, to reduce memory usage.
-        __slots__ = ('events',)
+        __slots__ = ('events', 'motion_time')
+
+        CAPACITY = 32
+
+        # Window events after which the whole screen must be painted again, as far as this pygame version has them.
+        REPAINT_EVENTS = tuple(getattr(pygame, name) for name in (
+            "VIDEOEXPOSE", "ACTIVEEVENT", "VIDEORESIZE", "WINDOWEVENT", "WINDOWEXPOSED", "WINDOWSHOWN",
+            "WINDOWRESTORED", "WINDOWMAXIMIZED", "WINDOWSIZECHANGED") if hasattr(pygame, name))
+
+        # The only event types that reach the queue; the rest are dropped by SDL.
+        ALLOWED_EVENTS = (pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION,
+                          pygame.KEYDOWN) + REPAINT_EVENTS
 
         def __init__(self):
             # type: () -> None
             """EventQueue instance initializer.
             """
-            self.events = []  # type: list
+            self.events = deque(maxlen=GUI.EventQueue.CAPACITY)  # type: deque
+            self.motion_time = 0  # type: int
+            if pygame.display.get_init():
+                pygame.event.set_blocked(None)
+                pygame.event.set_allowed(list(GUI.EventQueue.ALLOWED_EVENTS) + [GUI.WAKE_EVENT])
 
         # NOTE: new in 1.01 - the empty property.
         @property
@@ -976,6 +2495,16 @@ class GUI(object):
             """
             return len(self.events) == 0
 
+        @property
+        def ready(self):
+            # type: () -> bool
+            """True if latest_complete has something new to return: a finished event or a press that moved.
+            """
+            if len(self.events) == 0:
+                return False
+            tail = self.events[-1]
+            return not isinstance(tail, GUI.LongClickEvent) or tail.mouse_up is not None or tail.updated
+
         # NOTE: new in 1.01 - the tail property.
         @property
         def tail(self):
@@ -992,48 +2521,52 @@ class GUI(object):
             if not self.empty:
                 self.events[-1] = value
 
+        def clear(self):
+            # type: () -> None
+            """Drops every event in the queue.
+            """
+            self.events.clear()
+            pygame.event.clear()
+
         def check(self):
             # type: () -> None
             """Updates the event queue.
             """
-            # for event in pygame.event.get():
-            #     print(event.type == pygame.MOUSEBUTTONUP, self.tail.__class__.__name__)
-            #
-            #     last_event = None               # type: GUI.LongClickEvent
-            #     if not self.empty and isinstance(self.tail, GUI.LongClickEvent):
-            #         last_event = self.tail
-            #
-            #     if event.type == pygame.QUIT:
-            #         State.exit()
-            #
-            #     elif event.type == pygame.MOUSEBUTTONUP and last_event is not None:
-            #         print("MOUSE UP")
-            #         last_event.end(event)
-            #         if not last_event.is_valid_longclick():
-            #             self.tail = last_event.mouse_up
-            #
-            #     elif event.type == pygame.MOUSEBUTTONDOWN:
-            #         self.events.append(GUI.LongClickEvent(event))
-            #
-            #     elif event.type == pygame.MOUSEMOTION and last_event is not None:
-            #         last_event.intermediate_update(event)
+            # Any wake event posted so far is drained below, so later wakes must post a new one. Clearing the flag
+            # before draining means a wake racing with this call is, at worst, delivered twice.
+            state.gui.wake_pending = False
+            motion = None
             for event in pygame.event.get():
-                empty = len(self.events) == 0
+                if event.type == pygame.MOUSEMOTION:
+                    motion = event
+                    continue
+                if motion is not None:
+                    self.add_motion(motion)
+                    motion = None
 
                 if event.type == pygame.QUIT:
                     State.exit()
+                if event.type in GUI.EventQueue.REPAINT_EVENTS:
+                    state.gui.invalidate()
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     self.events.append(GUI.LongClickEvent(event))
 
-                if (event.type == pygame.MOUSEMOTION and not empty and
-                        isinstance(self.events[-1], GUI.LongClickEvent)):
-                    self.events[-1].intermediate_update(event)
-
-                if (event.type == pygame.MOUSEBUTTONUP and not empty and
+                if (event.type == pygame.MOUSEBUTTONUP and not self.empty and
                         isinstance(self.events[-1], GUI.LongClickEvent)):
-                    self.events[-1].end(event)
-                    if not self.events[-1].check_valid_longclick():
-                        self.events[-1] = self.events[-1].mouse_up
+                    press = self.events[-1]
+                    press.end(event)
+                    if not press.is_valid_longclick():
+                        self.events[-1] = GUI.ClickEvent(event.pos, event, press.mouse_up_time)
+            if motion is not None:
+                self.add_motion(motion)
+
+        def add_motion(self, mouse_move):
+            # type: (pygame.event.Event) -> None
+            """Adds a mouse position to the press in progress, if any.
+            """
+            if not self.empty and isinstance(self.events[-1], GUI.LongClickEvent):
+                self.motion_time = pygame.time.get_ticks()
+                self.events[-1].intermediate_update(mouse_move)
 
         def get_latest(self):
             # type: () -> GUI.Event
@@ -1050,30 +2583,41 @@ class GUI(object):
             if ev in self.events:
                 self.events.remove(ev)
 
+        def next_complete(self):
+            # type: () -> Event
+            """Removes and returns the oldest complete event, or None if there is nothing new.
+
+            A press still in progress at the end of the queue is handled as in latest_complete.
+            """
+            while len(self.events) > 0:
+                event = self.events[0]
+                if isinstance(event, GUI.LongClickEvent) and event.mouse_up is None:
+                    if len(self.events) == 1:
+                        return self.latest_complete
+                    # A press that never got its release, superseded by a newer one.
+                    self.events.popleft()
+                    continue
+                return self.events.popleft()
+            return None
+
         @property
         def latest_complete(self):
             # type: () -> Event
-            """Gets the last complete event from the queue or None if the queue is empty.
-
-            The event returned is removed from the queue.
-            """
-            for event in reversed(self.events[:]):
-                if isinstance(event, GUI.LongClickEvent):
-                    if event.mouse_up is None:
-                        self.events.remove(event)
-                        return event
-                    else:
-                        return GUI.IntermediateUpdateEvent(self.tail.latest_update, self.tail)
-                else:
-                    self.events.remove(event)
-                    return event
-            return None
+            """Gets the last complete event from the queue or None if there is nothing new.
 
-        def clear(self):
-            # type: () -> None
-            """Removes all events from the queue.
+            A finished event is removed from the queue. A press still in progress stays queued, and an
+            IntermediateUpdateEvent with its latest position is returned once for each batch of motion.
             """
-            del self.events[:]  # remember to replace this by list.clear() in Python3
+            if self.empty:
+                return None
+            event = self.events[-1]
+            if isinstance(event, GUI.LongClickEvent) and event.mouse_up is None:
+                if not event.updated:
+                    return None
+                event.updated = False
+                return GUI.IntermediateUpdateEvent(event.latest_update, event, self.motion_time)
+            self.events.pop()
+            return event
 
     # NOTE: New on 1.01 - A namedtuple enumerating the component event types.
     CompEvt = namedtuple(
@@ -1091,21 +2635,30 @@ class GUI(object):
         """Component is the base class of ui elements of the GUI toolkit.
         """
 
+        __slots__ = ('_position', 'parent', 'dirty', '_event_bindings', '_event_data', '_internal_click_overrides',
+                     'data', 'surface', 'border', 'border_color', 'resizable', 'originals', '_width', '_height',
+                     'computed_width', 'computed_height', 'computed_position', 'rect', '_inner_click_coordinates',
+                     'inner_offset', '__weakref__')
+
         def __init__(self, position, **data):
             # type: (Tuple[int, int], ...) -> None
             """Component instance initializer.
             :param position: the component position.
             :param data: optional set of keyword arguments related to the component.
             """
-            self.position = list(deepcopy(position))
-            self.event_bindings = {comp_evt: None for comp_evt in GUI.CompEvt}
-            self.event_data = {evt_data: None for evt_data in GUI.CompEvtData}
+            self.position = list(position)
+            self.parent = None  # type: GUI.Container
+            self.dirty = True  # type: bool
+            # Event tables are only allocated for components that actually bind events (see event_bindings).
+            self._event_bindings = None  # type: dict
+            self._event_data = None  # type: dict
+            self._internal_click_overrides = None  # type: dict
             self.data = data
             self.surface = data.get("surface", None)
             self.border = 0
             self.border_color = (0, 0, 0)
             self.resizable = data.get("resizable", False)
-            self.originals = [list(deepcopy(position)),
+            self.originals = [list(position),
                               data.get("width",
                                        data["surface"].get_width() if data.get("surface", False) is not False else 0),
                               data.get("height",
@@ -1118,40 +2671,128 @@ class GUI(object):
             self.computed_position = [0, 0]
             self.rect = pygame.Rect(self.computed_position, (self.computed_width, self.computed_height))
             self._inner_click_coordinates = (-1, -1)
-            self.inner_offset = [0, 0]
-            self.internal_click_overrides = {}
+            self.inner_offset = (0, 0)
 
             self.set_dimensions()
 
             for comp_evt in GUI.CompEvt:
-                self.event_bindings[comp_evt] = data.get(comp_evt)
+                if data.get(comp_evt) is not None:
+                    self.event_bindings[comp_evt] = data[comp_evt]
 
             for comp_data in GUI.CompEvtData:
-                self.event_data[comp_data] = data.get(comp_data)
+                if data.get(comp_data) is not None:
+                    self.event_data[comp_data] = data[comp_data]
 
             if "border" in data:
                 self.border = int(data["border"])
                 self.border_color = data.get("borderColor", state.color_palette.get_color(GUI.Palette.background))
 
+        def _render_attribute_set(self):
+            # type: () -> None
+            """Flags the component for rendering after an attribute that affects its output was assigned directly.
+            Assignments made while the component is being initialized are ignored.
+            """
+            if getattr(self, "rect", None) is not None:
+                self.set_dirty()
+
+        @property
+        def position(self):
+            # type: () -> list
+            """Gets or sets the component position; the change is applied the next time the component renders.
+            """
+            return self._position
+
+        @position.setter
+        def position(self, value):
+            # type: (list) -> None
+            changed = getattr(self, "_position", None) != value
+            self._position = value
+            if changed:
+                self._render_attribute_set()
+
+        @property
+        def width(self):
+            # type: () -> Union[int, str]
+            """Gets or sets the component width; the change is applied the next time the component renders.
+            """
+            return self._width
+
+        @width.setter
+        def width(self, value):
+            # type: (Union[int, str]) -> None
+            changed = getattr(self, "_width", None) != value
+            self._width = value
+            if changed:
+                self._render_attribute_set()
+
+        @property
+        def height(self):
+            # type: () -> Union[int, str]
+            """Gets or sets the component height; the change is applied the next time the component renders.
+            """
+            return self._height
+
+        @height.setter
+        def height(self, value):
+            # type: (Union[int, str]) -> None
+            changed = getattr(self, "_height", None) != value
+            self._height = value
+            if changed:
+                self._render_attribute_set()
+
+        @property
+        def event_bindings(self):
+            # type: () -> dict
+            """Gets or sets the event handlers, keyed by CompEvt values.
+            """
+            if self._event_bindings is None:
+                self._event_bindings = {}
+            return self._event_bindings
+
+        @event_bindings.setter
+        def event_bindings(self, value):
+            # type: (dict) -> None
+            self._event_bindings = value
+
+        @property
+        def event_data(self):
+            # type: () -> dict
+            """Gets or sets the arguments passed to the event handlers, keyed by CompEvtData values.
+            """
+            if self._event_data is None:
+                self._event_data = {}
+            return self._event_data
+
+        @event_data.setter
+        def event_data(self, value):
+            # type: (dict) -> None
+            self._event_data = value
+
+        @property
+        def internal_click_overrides(self):
+            # type: () -> dict
+            """Gets or sets the component's own event handlers, as (method, arguments) pairs keyed by CompEvt values.
+            """
+            if self._internal_click_overrides is None:
+                self._internal_click_overrides = {}
+            return self._internal_click_overrides
+
+        @internal_click_overrides.setter
+        def internal_click_overrides(self, value):
+            # type: (dict) -> None
+            self._internal_click_overrides = value
+
         def _percent_to_pix(self, value, scale):
             # type: (str, int) -> int
             """Converts a percentage value (as str) to a pixel value (as int).
             """
             return int(int(value.rstrip("%")) * scale)
 
-        def set_dimensions(self):
-            old_surface = self.surface.copy() if self.surface is not None else None  # type: pygame.Surface
-
-            if self.data.get("fixedSize", False):
-                self.computed_width = self.data.get("width")
-                self.computed_height = self.data.get("height")
-                self.rect = pygame.Rect(self.computed_position, (self.computed_width, self.computed_height))
-                self.surface = pygame.Surface((self.computed_width, self.computed_height), pygame.SRCALPHA)
-                if old_surface is not None:
-                    self.surface.blit(old_surface, (0, 0))
-                return
+        def compute_position(self):
+            # type: () -> None
+            """Computes the component position from its (possibly relative or scaled) position.
+            """
             appc = state.active_application.ui
-            # Compute Position
             if isinstance(self.position[0], str):
                 self.computed_position[0] = self._percent_to_pix(self.position[0],
                                                                  (state.active_application.ui.width / 100.0))
@@ -1170,7 +2811,11 @@ class GUI(object):
                 else:
                     self.computed_position[1] = int(self.position[1])
 
-            # Compute Width and Height
+        def compute_size(self):
+            # type: () -> None
+            """Computes the component width and height from its (possibly relative or scaled) dimensions.
+            """
+            appc = state.active_application.ui
             if isinstance(self.width, str):
                 self.computed_width = self._percent_to_pix(self.width, (state.active_application.ui.width / 100.0))
             else:
@@ -1187,14 +2832,143 @@ class GUI(object):
                 else:
                     self.computed_height = int(self.height)
 
-            # print("Computed to: {}, {}x{}, {}".format(
-            #     self.computed_position, self.computed_width, self.computed_height, self.resizable))
+        def resize_surface(self):
+            # type: () -> None
+            """Allocates a surface of the computed size, keeping the current contents.
+            The current surface is reused when it already has the computed size.
+            """
+            old_surface = self.surface  # type: pygame.Surface
+            size = (self.computed_width, self.computed_height)
+            if old_surface is not None and old_surface.get_size() == size:
+                return
+            self.surface = state.gui.create_surface(size)
+            if old_surface is not None:
+                self.surface.blit(old_surface, (0, 0))
+
+        def set_dimensions(self):
+            # type: () -> None
+            """Computes the component position and size, reallocating the surface only if the size changed.
+            """
+            old_screen_rect = self.get_screen_rect()  # type: pygame.Rect
+            old_rect = self.rect  # type: pygame.Rect
+
+            if self.data.get("fixedSize", False):
+                self.computed_width = self.data.get("width")
+                self.computed_height = self.data.get("height")
+            else:
+                self.compute_position()
+                self.compute_size()
 
             self.rect = pygame.Rect(self.computed_position, (self.computed_width, self.computed_height))
-            self.surface = pygame.Surface((self.computed_width, self.computed_height), pygame.SRCALPHA)
+            self.resize_surface()
+            if self.parent is not None:
+                self.parent.hit_index = None
+            self._invalidate_moved(old_screen_rect, old_rect)
 
-            if old_surface is not None:
-                self.surface.blit(old_surface, (0, 0))
+        def move(self):
+            # type: () -> None
+            """Recomputes the component position only; used when the size is known to be unchanged.
+            """
+            if self.data.get("fixedSize", False):
+                return
+            old_screen_rect = self.get_screen_rect()  # type: pygame.Rect
+            old_rect = self.rect  # type: pygame.Rect
+            self.compute_position()
+            self.rect = pygame.Rect(self.computed_position, (self.computed_width, self.computed_height))
+            self._invalidate_moved(old_screen_rect, old_rect)
+
+        def _invalidate_moved(self, old_screen_rect, old_rect):
+            # type: (pygame.Rect, pygame.Rect) -> None
+            """Reports the old and the new screen areas if the component bounds changed.
+            """
+            if self.parent is not None and old_rect != self.rect:
+                self.parent.hit_index = None
+            if old_screen_rect is not None and old_screen_rect != self.get_screen_rect():
+                state.gui.invalidate(old_screen_rect)
+                self.mark_dirty()
+
+        def is_screen_root(self):
+            # type: () -> bool
+            """Returns whether this component is rendered straight onto the screen.
+            """
+            return self.data.get("screenRoot", False)
+
+        def get_absolute_position(self):
+            # type: () -> tuple
+            """Returns the component position in screen coordinates.
+            """
+            if self.parent is None:
+                return self.computed_position[0], self.computed_position[1]
+            parent_x, parent_y = self.parent.get_absolute_position()
+            view_x, view_y = self.parent.view_offset
+            return parent_x + self.computed_position[0] - view_x, parent_y + self.computed_position[1] - view_y
+
+        def get_screen_rect(self):
+            # type: () -> pygame.Rect
+            """Returns the screen area covered by the component, or None if it is not displayed.
+            """
+            root = self
+            while root.parent is not None:
+                root = root.parent
+            if not root.is_screen_root():
+                return None
+            width, height = self.computed_width, self.computed_height
+            if self.surface is not None:
+                width = max(width, self.surface.get_width())
+                height = max(height, self.surface.get_height())
+            return pygame.Rect(self.get_absolute_position(), (width, height))
+
+        def set_dirty(self):
+            # type: () -> None
+            """Flags the component and its ancestors, up to the compositor layer holding it, to be rendered again.
+            """
+            if state.gui.debug_threads:
+                state.gui.check_thread(self)
+            component = self
+            while component is not None:
+                component.dirty = True
+                component = None if component.is_screen_root() else component.parent
+            state.gui.wake()
+
+        def invalidate_every(self, interval, callback=None, aligned=False):
+            # type: (int, callable, bool) -> GUI.TimerService.Schedule
+            """Repaints the component periodically, through the shared timer service.
+            :param interval: the milliseconds between repaints.
+            :param callback: called before each repaint, usually to update the component contents.
+            :param aligned: True to repaint on wall-clock multiples of interval (60000 repaints as the minute changes).
+            :return: a handle for cancel_invalidation().
+            """
+            delay = GUI.TimerService.get_aligned_delay(interval) if aligned else interval
+            return state.timer_service.schedule(self, delay, interval, aligned, callback)
+
+        def invalidate_at(self, when, callback=None):
+            # type: (Union[datetime, int], callable) -> GUI.TimerService.Schedule
+            """Repaints the component once, through the shared timer service.
+            :param when: a datetime, or a delay in milliseconds.
+            :param callback: called before the repaint, usually to update the component contents.
+            :return: a handle for cancel_invalidation().
+            """
+            if isinstance(when, datetime):
+                when = max(0, int((when - datetime.now()).total_seconds() * 1000))
+            return state.timer_service.schedule(self, when, None, False, callback)
+
+        def cancel_invalidation(self, handle=None):
+            # type: (GUI.TimerService.Schedule) -> None
+            """Cancels a scheduled repaint, or all of them if no handle is given.
+            """
+            if handle is not None:
+                state.timer_service.cancel(handle)
+            else:
+                state.timer_service.cancel(component=self)
+
+        def mark_dirty(self):
+            # type: () -> None
+            """Flags the component for rendering and reports its screen area as changed.
+            """
+            self.set_dirty()
+            screen_rect = self.get_screen_rect()
+            if screen_rect is not None:
+                state.gui.invalidate(screen_rect)
 
         # NOTE: new in 1.01 - the non public _handles() method.
         def _handles(self, event):
@@ -1202,7 +2976,7 @@ class GUI(object):
             """Returns whether the given event name is being handle by the component.
             """
             # could also check if `event` is a valid CompEvt member
-            return event in self.event_bindings and self.event_bindings[event] is not None
+            return self._event_bindings is not None and self._event_bindings.get(event) is not None
 
         # NOTE: new in 1.01 - the non public _overrides() method.
         def _overrides(self, event):
@@ -1210,14 +2984,15 @@ class GUI(object):
             """Returns whether the given event name is being overriden by the component.
             """
             # could also check if `event` is a valid CompEvt member
-            return event in self.internal_click_overrides and self.internal_click_overrides[event] is not None
+            return (self._internal_click_overrides is not None and
+                    self._internal_click_overrides.get(event) is not None)
 
         def _has_evtdata(self, event):
             # type: (str) -> bool
             """Returns whether the given event name is being overriden by the component.
             """
             # could also check if `event` is a valid CompEvtData member
-            return event in self.event_data and self.event_data[event] is not None
+            return self._event_data is not None and self._event_data.get(event) is not None
 
         def on_click(self):
             # type: () -> None
@@ -1273,22 +3048,39 @@ class GUI(object):
             # type: (callable, tuple) -> None
             """Registers the onClick event handler
             """
-            self.event_bindings["onClick"] = mtd
-            self.event_data["onClick"] = data
+            self.event_bindings[GUI.CompEvt.on_click] = mtd
+            self.event_data[GUI.CompEvtData.on_click_data] = data
 
         def set_on_long_click(self, mtd, data=()):
             # type: (callable, tuple) -> None
             """Registers the onLongClick event handler
             """
-            self.event_bindings["onLongClick"] = mtd
-            self.event_data["onLong"] = data
+            self.event_bindings[GUI.CompEvt.on_longclick] = mtd
+            self.event_data[GUI.CompEvtData.on_longclick_data] = data
 
         def set_on_intermediate_update(self, mtd, data=()):
             # type: (callable, tuple) -> None
             """Registers the onIntermediateUpdate event handler
             """
-            self.event_bindings["onIntermediateUpdate"] = mtd
-            self.event_data["onIntermediateUpdate"] = data
+            self.event_bindings[GUI.CompEvt.on_intermediate_updt] = mtd
+            self.event_data[GUI.CompEvtData.on_intermediate_updt_data] = data
+
+        def update_geometry(self):
+            # type: () -> bool
+            """Applies the position and size changes made since the last frame.
+            :return: True if the component moved or was resized.
+            """
+            moved = self.position != self.originals[0]
+            resized = self.width != self.originals[1] or self.height != self.originals[2]
+            if moved:
+                self.originals[0] = list(self.position)
+            if resized:
+                self.originals[1] = self.width
+                self.originals[2] = self.height
+                self.set_dimensions()
+            elif moved:
+                self.move()
+            return moved or resized
 
         def render(self, larger_surface):
             # type: (pygame.Surface) -> None
@@ -1296,29 +3088,26 @@ class GUI(object):
 
             :param larger_surface: the surface to blit this component into.
             """
-            recompute = False
-            if self.position != self.originals[0]:
-                self.originals[0] = list(deepcopy(self.position))
-                recompute = True
-            if self.width != self.originals[1]:
-                self.originals[1] = self.width
-                recompute = True
-            if self.height != self.originals[2]:
-                self.originals[2] = self.height
-                recompute = True
-            if recompute:
-                self.set_dimensions()
-            if self.border > 0:
-                pygame.draw.rect(self.surface, self.border_color, [0, 0, self.computed_width, self.computed_height],
-                                 self.border)
+            self.update_geometry()
             if not self.surface.get_locked():
-                larger_surface.blit(self.surface, self.computed_position)
+                if self.parent is None:
+                    x, y = self.computed_position
+                else:
+                    view_x, view_y = self.parent.view_offset
+                    x, y = self.computed_position[0] - view_x, self.computed_position[1] - view_y
+                larger_surface.blit(self.surface, (x, y))
+                # The border goes onto the larger surface, since the component surface may be shared (text cache,
+                # asset cache, icons).
+                if self.border > 0:
+                    pygame.draw.rect(larger_surface, self.border_color,
+                                     [x, y, self.computed_width, self.computed_height], self.border)
 
         def refresh(self):
             # type: () -> None
             """Updates the component's boundaries.
             """
             self.set_dimensions()
+            self.mark_dirty()
 
         # NOTE: new in 1.01 - getInnerClickCoordinates() turned into a property
         @property
@@ -1353,6 +3142,8 @@ class GUI(object):
             :param pos: the new position.
             """
             self.position = list(pos)
+            if self.parent is not None:
+                self.parent.hit_index = None
             self.refresh()
 
         def set_surface(self, new_surface, override_dimensions=False):
@@ -1366,6 +3157,7 @@ class GUI(object):
                 else:
                     new_surface = pygame.transform.scale(new_surface, (self.computed_width, self.computed_height))
             self.surface = new_surface
+            self.mark_dirty()
 
         @staticmethod
         def default(*items):
@@ -1384,6 +3176,12 @@ class GUI(object):
         """Represents a Component that can contain other Components.
         """
 
+        __slots__ = ('SKIP_CHILD_CHECK', '_background_color', 'child_components', 'hit_index', 'transparent',
+                     'view_offset')
+
+        # Containers with fewer children than this are hit-tested with a plain scan.
+        HIT_INDEX_THRESHOLD = 16
+
         def __init__(self, position, **data):
             # type: (tuple, ...) -> None
             """Container instance initializer.
@@ -1392,13 +3190,31 @@ class GUI(object):
             """
             super(GUI.Container, self).__init__(position, **data)
             self.transparent = False
-            self.background_color = (0, 0, 0)
+            self._background_color = (0, 0, 0)
             self.child_components = []
+            self.hit_index = None  # type: GUI.SpatialIndex
+            # The point of the children's coordinate space shown at the container's top left corner.
+            self.view_offset = (0, 0)  # type: tuple
             self.SKIP_CHILD_CHECK = False
             self.transparent = data.get("transparent", False)  # type: bool
             self.background_color = data.get("color", state.color_palette.get_color(GUI.Palette.background))
             if "children" in data:
                 self.child_components = data["children"]
+                for child in self.child_components:
+                    child.parent = self
+
+        @property
+        def background_color(self):
+            # type: () -> tuple
+            """Gets or sets the container fill color.
+            """
+            return self._background_color
+
+        @background_color.setter
+        def background_color(self, value):
+            # type: (tuple) -> None
+            self._background_color = value
+            self.mark_dirty()
 
         def add_child(self, component):
             # type: (Union[Component, Container]) -> None
@@ -1410,7 +3226,10 @@ class GUI(object):
             if self.resizable and "resizable" not in component.data:
                 component.resizable = True
                 component.refresh()
+            component.parent = self
             self.child_components.append(component)
+            self.hit_index = None
+            component.mark_dirty()
 
         def add_children(self, *children):
             # type: (...) -> None
@@ -1423,13 +3242,66 @@ class GUI(object):
             # type: (Union[Component, Container]) -> None
             """Removes a child component.
             """
+            component.mark_dirty()
             self.child_components.remove(component)
+            self.hit_index = None
+            component.parent = None
+
+        def replace_child(self, old_component, new_component):
+            # type: (Component, Component) -> None
+            """Replaces a child component in place, keeping its rendering order.
+            :param old_component: the child to replace.
+            :param new_component: the component to put in its place.
+            """
+            old_component.mark_dirty()
+            self.child_components[self.child_components.index(old_component)] = new_component
+            old_component.parent = None
+            new_component.parent = self
+            self.hit_index = None
+            new_component.mark_dirty()
 
         def clear_children(self):
             # type: (Union[Component, Container]) -> None
             """Removes all child components.
             """
+            self.mark_dirty()
+            for child in self.child_components:
+                child.parent = None
             del self.child_components[:]
+            self.hit_index = None
+
+        def get_hit_candidates(self, mouse_event, offset_x=0, offset_y=0):
+            # type: (pygame.event.Event, int, int) -> list
+            """Returns the children that may contain the mouse event, topmost first.
+
+            Large containers answer from a spatial index that is rebuilt after children are added, removed or moved.
+            :param mouse_event: the mouse event to check.
+            :param offset_x: non client left offset
+            :param offset_y: non client top offset
+            """
+            children = self.child_components
+            if len(children) < self.HIT_INDEX_THRESHOLD:
+                return children[::-1]
+            if self.hit_index is None or not self.hit_index.is_valid(children):
+                self.hit_index = GUI.SpatialIndex(children)
+            content_x = mouse_event.pos[0] - offset_x - self.computed_position[0] + self.view_offset[0]
+            content_y = mouse_event.pos[1] - offset_y - self.computed_position[1] + self.view_offset[1]
+            return self.hit_index.query(content_x, content_y)
+
+        @staticmethod
+        def get_clicked_descendant(child, mouse_event, offset_x, offset_y):
+            # type: (Component, pygame.event.Event, int, int) -> Component
+            """Returns the child, or one of its descendants, if it contains the mouse event, or None otherwise.
+            :param child: the child component to check.
+            :param mouse_event: the mouse event to check.
+            :param offset_x: the child's non client left offset
+            :param offset_y: the child's non client top offset
+            """
+            if hasattr(child, "SKIP_CHILD_CHECK") and not child.SKIP_CHILD_CHECK:
+                return child.get_clicked_child(mouse_event, offset_x, offset_y)
+            if child.check_click(mouse_event, offset_x, offset_y):
+                return child
+            return None
 
         def get_clicked_child(self, mouse_event, offset_x=0, offset_y=0):
             # type: (pygame.event.Event, int, int) -> Component
@@ -1439,26 +3311,12 @@ class GUI(object):
             :param offset_y: non client top offset
             :return: a component or None
             """
-            for child in reversed(self.child_components[:]):
-                # curr_child -= 1
-                # child = self.child_components[curr_child]
-                if hasattr(child, "SKIP_CHILD_CHECK"):
-                    if child.SKIP_CHILD_CHECK:
-                        if child.check_click(mouse_event, offset_x + self.computed_position[0],
-                                             offset_y + self.computed_position[1]):
-                            return child
-                        else:
-                            continue
-                    else:
-                        sub_check = child.get_clicked_child(mouse_event, offset_x + self.computed_position[0],
-                                                            offset_y + self.computed_position[1])
-                        if sub_check is None:
-                            continue
-                        return sub_check
-                else:
-                    if child.check_click(mouse_event, offset_x + self.computed_position[0],
-                                         offset_y + self.computed_position[1]):
-                        return child
+            child_offset_x = offset_x + self.computed_position[0] - self.view_offset[0]
+            child_offset_y = offset_y + self.computed_position[1] - self.view_offset[1]
+            for child in self.get_hit_candidates(mouse_event, offset_x, offset_y):
+                clicked = GUI.Container.get_clicked_descendant(child, mouse_event, child_offset_x, child_offset_y)
+                if clicked is not None:
+                    return clicked
             if self.check_click(mouse_event, offset_x, offset_y):
                 return self
             return None
@@ -1477,18 +3335,35 @@ class GUI(object):
         def render(self, larger_surface):
             # type: (pygame.Surface) -> None
             """Renders the Container (and its children).
+
+            The composed surface is kept between frames, and the children are only
+            rendered again when something in the subtree was marked dirty.
             :param larger_surface: the surface to render into.
             """
             if self.surface.get_locked():
                 return
-            if not self.transparent:
-                self.surface.fill(self.background_color)
-            else:
-                self.surface.fill((0, 0, 0, 0))
-            for child in self.child_components:
-                child.render(self.surface)
+            self.compose()
             super(GUI.Container, self).render(larger_surface)
 
+        def compose(self):
+            # type: () -> None
+            """Renders the children into the container's own surface, if something in the subtree was marked dirty.
+            """
+            if self.dirty:
+                self.dirty = False
+                if not self.transparent:
+                    self.surface.fill(self.background_color)
+                else:
+                    self.surface.fill((0, 0, 0, 0))
+                view_rect = pygame.Rect(self.view_offset, self.surface.get_size())
+                for child in self.child_components:
+                    child.update_geometry()
+                    child_rect = pygame.Rect(child.computed_position,
+                                             (max(child.computed_width, child.surface.get_width()),
+                                              max(child.computed_height, child.surface.get_height())))
+                    if view_rect.colliderect(child_rect):
+                        child.render(self.surface)
+
         def refresh(self, children=True):
             # type: (bool) -> None
             """Updates the Container dimensions (and its children, optionally)
@@ -1503,12 +3378,12 @@ class GUI(object):
         """A Container suited for applications.
         """
 
+        __slots__ = ('application', 'dialogs', 'scale_x', 'scale_y')
+
         def __init__(self, application):
             # type: (Application) -> None
             self.application = application
             self.dialogs = []
-            self.dialog_screen_freezes = []
-            self.dialog_components_freezes = []
             self.child_components = None
             self.scale_x = 1.0
             self.scale_y = 1.0
@@ -1529,34 +3404,62 @@ class GUI(object):
         def set_dialog(self, dialog):
             # type: (Union[Overlay, Dialog]) -> None
             """Pops up a Dialog or Overlay.
+
+            The dialog is composited in its own layer above the application, which is neither rendered again nor
+            snapshotted; it only stops receiving clicks while the dialog is up.
             :param dialog: the dialog to pop up.
             """
             self.dialogs.insert(0, dialog)
-            self.dialog_components_freezes.insert(0, self.child_components[:])
-            self.dialog_screen_freezes.insert(0, self.surface.copy())
-            self.add_child(dialog.baseContainer)
+            dialog.base_container.parent = self
+            dialog.base_container.data["screenRoot"] = True
+            dialog.base_container.mark_dirty()
 
         def clear_dialog(self):
             # type: () -> None
-            """Closes the active dialog.
+            """Closes the active dialog, recompositing only the area it covered.
             """
+            base_container = self.dialogs[0].base_container
+            screen_rect = base_container.get_screen_rect()
             self.dialogs.pop(0)
-            self.child_components = self.dialog_components_freezes[0]
-            self.dialog_components_freezes.pop(0)
-            self.dialog_screen_freezes.pop(0)
+            base_container.parent = None
+            if screen_rect is not None:
+                state.gui.invalidate(screen_rect)
+
+        def get_clicked_child(self, mouse_event, offset_x=0, offset_y=0):
+            # type: (pygame.event.Event, int, int) -> GUI.Component
+            """Overrides Container.get_clicked_child; while a dialog is up, only the topmost one receives clicks.
+            """
+            if len(self.dialogs) > 0:
+                return GUI.Container.get_clicked_descendant(self.dialogs[0].base_container, mouse_event,
+                                                            offset_x + self.computed_position[0] - self.view_offset[0],
+                                                            offset_y + self.computed_position[1] - self.view_offset[1])
+            return super(GUI.AppContainer, self).get_clicked_child(mouse_event, offset_x, offset_y)
+
+        def is_screen_root(self):
+            # type: () -> bool
+            """Returns whether this is the user interface of the active application.
+            """
+            return state.active_application is self.application
+
+        def get_absolute_position(self):
+            # type: () -> tuple
+            """Returns the container position in screen coordinates.
+            """
+            return self.position[0], self.position[1]
 
         # NOTE: changed in 1.01 - added largerSurface parameter to match base class method signature.
         def render(self, larger_surface=None):
             # type: (Any) -> None
-            """Renders the AppContainer.
+            """Renders the AppContainer and its dialogs straight to the screen.
+
+            The main loop goes through state.compositor instead, which only recomposites the changed areas.
             :param larger_surface: this parameter is not relevant for this class.
             """
-            if len(self.dialogs) == 0:
-                super(GUI.AppContainer, self).render(self.surface)
-            else:
-                self.surface.blit(self.dialog_screen_freezes[0], (0, 0))
-                self.dialogs[0].baseContainer.render(self.surface)
+            self.update_geometry()
+            self.compose()
             screen.blit(self.surface, self.position)
+            for dialog in reversed(self.dialogs):
+                dialog.base_container.render(screen)
 
         # NOTE: changed in 1.01 - added children parameter to match base class method signature.
         def refresh(self, children=False):
@@ -1574,8 +3477,11 @@ class GUI(object):
                 self.scale_x = 1.0 * (state.gui.width / d_w)
                 self.scale_y = 1.0 * (state.gui.height / d_h)
                 # super(GUI.AppContainer, self).refresh()
+            self.mark_dirty()
 
     class Text(Component):
+        __slots__ = ('_original_text', '_color', '_text', 'font', 'responsive_width', 'size', 'use_freetype')
+
         def __init__(self, position, text, color=DEFAULT, size=DEFAULT, **data):
             # type: (Union[tuple, list], str, int, int, ...) -> None
             """Text instance initializer.
@@ -1597,21 +3503,53 @@ class GUI(object):
             data["surface"] = self.get_rendered_text()
             super(GUI.Text, self).__init__(position, **data)
 
+        @property
+        def text(self):
+            # type: () -> str
+            """Gets or sets the text contents; the text is rendered again the next time the component renders.
+            """
+            return self._text
+
+        @text.setter
+        def text(self, value):
+            # type: (str) -> None
+            changed = getattr(self, "_text", None) != value
+            self._text = value
+            if changed:
+                self._render_attribute_set()
+
+        @property
+        def color(self):
+            # type: () -> tuple
+            """Gets or sets the text color; the text is rendered again the next time the component renders.
+            """
+            return self._color
+
+        @color.setter
+        def color(self, value):
+            # type: (tuple) -> None
+            changed = getattr(self, "_color", None) != value
+            self._color = value
+            if changed and getattr(self, "rect", None) is not None:
+                # Makes render() go through set_text, which renders the text in the new color.
+                self._original_text = None
+                self.set_dirty()
+
         def get_rendered_text(self):
             # type: () -> pygame.Surface
             """Renders the text and return its surface.
             """
-            r, g, b = self.color
-            a = 255
-            if self.use_freetype:
-                return self.font.get(self.size, True).render(str(self.text), self.color)
-            return self.font.get(self.size).render(self.text, 1, (r, g, b, a))
+            r, g, b = self.color[:3]
+            return state.text_cache.render(self.font, self.size, self.text, (r, g, b, 255), self.use_freetype)
 
         def refresh(self):
             # type: () -> None
             """Re-renders the text.
             """
+            self.mark_dirty()
             self.surface = self.get_rendered_text()
+            self._original_text = self.text
+            self.mark_dirty()
 
         def render(self, larger_surface):
             # type: (pygame.Surface) -> None
@@ -1638,53 +3576,81 @@ class GUI(object):
         """Represents a text that wraps into multiple lines.
         """
 
+        __slots__ = ('color', 'font', 'justification', 'size', 'text', 'textSurface', 'use_freetype')
+
         @staticmethod
-        def render_textrect(string, font, rect, text_color, background_color, justification, use_ft):
-            # type: (str, Union[pygame.Font, freetype.Font], pygame.Rect, tuple, tuple, int, bool) -> tuple
+        def layout(string, font, width, use_ft=False, size=14):
+            # type: (str, GUI.Font, int, bool, int) -> tuple
+            """Breaks a string into lines that fit a width.
+            Each word is measured once and lines are filled greedily from the summed widths.
+            :param string: the text to break.
+            :param font: the GUI.Font used to measure the text.
+            :param width: the available width.
+            :param use_ft: True to measure with freetype.
+            :param size: the font size.
+            :return: a (lines, total height, line height, err) tuple, err being 0 if a word is too long.
+            """
+            space = font.measure(" ", size, use_ft)
             final_lines = []
-            requested_lines = string.splitlines()
             err = None
-            for requested_line in requested_lines:
-                if font.size(requested_line)[0] > rect.width:
-                    words = requested_line.split(' ')
-                    for word in words:
-                        if font.size(word)[0] >= rect.width:
-                            print("The word '{}' is too long to fit in the rect passed.".format(word))
-                            err = 0
-                    accumulated_line = ""
-                    for word in words:
-                        test_line = accumulated_line + word + " "
-                        if font.size(test_line)[0] < rect.width:
-                            accumulated_line = test_line
-                        else:
-                            final_lines.append(accumulated_line)
-                            accumulated_line = word + " "
-                    final_lines.append(accumulated_line)
-                else:
+            for requested_line in string.splitlines():
+                words = requested_line.split(" ")
+                widths = [font.measure(word, size, use_ft) for word in words]
+                if sum(widths) + space * (len(words) - 1) <= width:
                     final_lines.append(requested_line)
-            surface = pygame.Surface(rect.size, pygame.SRCALPHA)
+                    continue
+                accumulated_line = []
+                accumulated_width = 0
+                for word, word_width in zip(words, widths):
+                    if word_width >= width:
+                        print("The word '{}' is too long to fit in the rect passed.".format(word))
+                        err = 0
+                    if accumulated_line and accumulated_width + word_width + space >= width:
+                        final_lines.append(" ".join(accumulated_line) + " ")
+                        accumulated_line = []
+                        accumulated_width = 0
+                    accumulated_line.append(word)
+                    accumulated_width += word_width + space
+                final_lines.append(" ".join(accumulated_line) + " ")
+            line_height = font.line_height(size, use_ft)
+            return final_lines, line_height * len(final_lines), line_height, err
+
+        @staticmethod
+        def render_lines(lines, font, size, surface_size, line_height, text_color, background_color, justification,
+                         use_ft):
+            # type: (list, GUI.Font, int, tuple, int, tuple, tuple, int, bool) -> tuple
+            """Renders lines produced by layout onto a new surface.
+            :return: a (surface, err) tuple, err being 1 if the lines overflow the surface and 2 for a bad justification.
+            """
+            surface = state.gui.create_surface(surface_size)
             surface.fill(background_color)
+            width, height = surface_size
+            err = 1 if line_height * len(lines) >= height and lines else None
             accumulated_height = 0
-            for line in final_lines:
-                if accumulated_height + font.size(line)[1] >= rect.height:
-                    err = 1
+            for line in lines:
+                if accumulated_height >= height:
+                    break
                 if line != "":
-                    # tempsurface = None
-                    if use_ft:
-                        tempsurface = font.render(line, text_color)
-                    else:
-                        tempsurface = font.render(line, 1, text_color)
+                    tempsurface = state.text_cache.render(font, size, line, text_color, use_ft)
                     if justification == 0:
                         surface.blit(tempsurface, (0, accumulated_height))
                     elif justification == 1:
-                        surface.blit(tempsurface, ((rect.width - tempsurface.get_width()) / 2, accumulated_height))
+                        surface.blit(tempsurface, ((width - tempsurface.get_width()) / 2, accumulated_height))
                     elif justification == 2:
-                        surface.blit(tempsurface, (rect.width - tempsurface.get_width(), accumulated_height))
+                        surface.blit(tempsurface, (width - tempsurface.get_width(), accumulated_height))
                     else:
                         print("Invalid justification argument: {}".format(justification))
                         err = 2
-                accumulated_height += font.size(line)[1]
-            return surface, err, final_lines
+                accumulated_height += line_height
+            return surface, err
+
+        @staticmethod
+        def render_textrect(string, font, rect, text_color, background_color, justification, use_ft, size=14):
+            # type: (str, GUI.Font, pygame.Rect, tuple, tuple, int, bool, int) -> tuple
+            final_lines, _, line_height, layout_err = GUI.MultiLineText.layout(string, font, rect.width, use_ft, size)
+            surface, err = GUI.MultiLineText.render_lines(final_lines, font, size, rect.size, line_height, text_color,
+                                                          background_color, justification, use_ft)
+            return surface, err if err is not None else layout_err, final_lines
 
         def __init__(self, position, text, color=DEFAULT, size=DEFAULT, justification=DEFAULT, **data):
             # type: (tuple, str, int, int, int, ...) -> None
@@ -1718,9 +3684,10 @@ class GUI(object):
             # type: () -> pygame.Surface
             """Render the text and returns its surface.
             """
-            return GUI.MultiLineText.render_textrect(self.text, self.font.get(self.size, self.use_freetype),
+            return GUI.MultiLineText.render_textrect(self.text, self.font,
                                                      pygame.Rect(0, 0, self.computed_width, self.computed_height),
-                                                     self.color, (0, 0, 0, 0), self.justification, self.use_freetype)[0]
+                                                     self.color, (0, 0, 0, 0), self.justification, self.use_freetype,
+                                                     self.size)[0]
 
         def refresh(self):
             # type: () -> None
@@ -1741,6 +3708,8 @@ class GUI(object):
             self.refresh()
 
     class ExpandingMultiLineText(MultiLineText):
+        __slots__ = ('line_height', 'linked_scroller', 'text_lines')
+
         def __init__(self, position, text, color=DEFAULT, size=DEFAULT, justification=DEFAULT, line_height=DEFAULT,
                      **data):
             # type: (Union[tuple, list], str, int, int, int, int, ...) -> None
@@ -1768,21 +3737,18 @@ class GUI(object):
             self.refresh()
 
         def get_rendered_text(self):
-            fits = False
-            surf = None
-            while not fits:
-                d = GUI.MultiLineText.render_textrect(self.text, self.font.get(self.size),
-                                                      pygame.Rect(self.computed_position[0], self.computed_position[1],
-                                                                  self.computed_width, self.height),
-                                                      self.color, (0, 0, 0, 0), self.justification, self.use_freetype)
-
-                surf = d[0]  # type: pygame.Surface
-                fits = d[1] != 1  # type: bool
-                self.text_lines = d[2]  # type: list
-                if not fits:
-                    self.height += self.line_height
-                    self.computed_height = self.height
-
+            # type: () -> pygame.Surface
+            """Lays the text out once and grows the height by whole line_height steps until it fits.
+            """
+            self.text_lines, total_height, line_height, _ = GUI.MultiLineText.layout(self.text, self.font,
+                                                                                      self.computed_width,
+                                                                                      self.use_freetype, self.size)
+            if self.text_lines and total_height >= self.height:
+                self.height += ((total_height - self.height) // self.line_height + 1) * self.line_height
+                self.computed_height = self.height
+            surf = GUI.MultiLineText.render_lines(self.text_lines, self.font, self.size,
+                                                  (self.computed_width, self.height), line_height, self.color,
+                                                  (0, 0, 0, 0), self.justification, self.use_freetype)[0]
             if self.linked_scroller is not None:
                 self.linked_scroller.refresh(False)
             return surf
@@ -1791,6 +3757,8 @@ class GUI(object):
         """Represents visual contents such as pictures, icons and similar.
         """
 
+        __slots__ = ('original_height', 'original_surface', 'original_width', 'path', 'resize_image', 'transparent')
+
         def __init__(self, position, **data):
             # type: (Union[tuple, list], ...) -> None
             """Image instance initializer.
@@ -1806,14 +3774,24 @@ class GUI(object):
             else:
                 self.path = "surface"
             if "surface" not in data:
-                data["surface"] = pygame.image.load(data["path"])
+                data["surface"] = state.asset_cache.get(data["path"])
+            else:
+                self.path = "surface"
             self.original_surface = data["surface"]  # type: pygame.Surface
             self.original_width = self.original_surface.get_width()  # type: int
             self.original_height = self.original_surface.get_height()  # type: int
             super(GUI.Image, self).__init__(position, **data)
             if self.resize_image:
-                self.set_surface(
-                    pygame.transform.scale(self.original_surface, (self.computed_width, self.computed_height)))
+                self.set_surface(self.get_scaled_surface())
+
+        def get_scaled_surface(self):
+            # type: () -> pygame.Surface
+            """Returns the image scaled to the component size, shared through the asset cache when loaded from a file.
+            """
+            size = (self.computed_width, self.computed_height)
+            if self.path != "surface":
+                return state.asset_cache.get(self.path, size)
+            return pygame.transform.scale(self.original_surface, size)
 
         def set_image(self, **data):
             # type: (...) -> None
@@ -1821,9 +3799,9 @@ class GUI(object):
             :param data:
             :return:
             """
-            self.path = data.get("path", "surface")
+            self.path = data.get("path", "surface") if "surface" not in data else "surface"
             if "surface" not in data:
-                data["surface"] = pygame.image.load(data["path"])
+                data["surface"] = state.asset_cache.get(data["path"])
             self.original_surface = data["surface"]
             if data.get("resize", False):
                 self.width = self.original_surface.get_width()
@@ -1835,12 +3813,12 @@ class GUI(object):
             """Updates the Image resource.
             """
             if self.resize_image:
-                self.set_surface(pygame.transform.scale(
-                    self.original_surface, (self.computed_width, self.computed_height)))
+                self.set_surface(self.get_scaled_surface())
             else:
                 super(GUI.Image, self).refresh()
 
     class Slider(Component):
+        __slots__ = ('_percent', 'background_color', 'color', 'on_change_method', 'percent_pixels', 'slider_color')
 
         def __init__(self, position, initial_pct=0, **data):
             super(GUI.Slider, self).__init__(position, **data)
@@ -1868,6 +3846,7 @@ class GUI(object):
         def percent(self, value):
             # type: (int) -> None
             self._percent = value
+            self.mark_dirty()
 
         def refresh(self):
             # type: () -> None
@@ -1894,10 +3873,12 @@ class GUI(object):
                 self._percent = (mouse_event.pos[0] - offset_x - self.computed_position[0]) / self.percent_pixels
                 if self._percent > 100.0:
                     self._percent = 100.0
+                self.mark_dirty()
                 self.on_change()
             return is_clicked
 
     class Button(Container):
+        __slots__ = ('padding_amount', 'text_component')
 
         def __init__(self, position, text, bg_color=DEFAULT, text_color=DEFAULT, text_size=DEFAULT, **data):
             # type: (tuple, str, tuple, tuple, int, ...) -> None
@@ -1961,6 +3942,7 @@ class GUI(object):
             return None
 
     class Checkbox(Component):
+        __slots__ = ('_checked', 'background_color', 'check_color', 'check_width')
 
         def __init__(self, position, checked=False, **data):
             # type: (tuple, bool, ...) -> None
@@ -1993,6 +3975,7 @@ class GUI(object):
                 self._checked = not self._checked
             else:
                 self._checked = check_state == CheckboxState.checked
+            self.mark_dirty()
 
         def render(self, larger_surface):
             # type: (pygame.Surface) -> None
@@ -2012,6 +3995,8 @@ class GUI(object):
         """Represents a toggle button.
         """
 
+        __slots__ = ('background_color', 'off_color', 'on', 'on_color')
+
         def __init__(self, position, on=False, **data):
             # type: (tuple, bool, ...) -> None
             """Switch instance initializer.
@@ -2046,7 +4031,8 @@ class GUI(object):
             if switch_state == SwitchState.toggle:
                 self.on = not self.on
             else:
-                self.on = switch_state == GUI.SwitchState.on
+                self.on = switch_state == SwitchState.on
+            self.mark_dirty()
 
         def render(self, larger_surface):
             # type: (pygame.Surface) -> None
@@ -2067,6 +4053,8 @@ class GUI(object):
 
     # WARNING: this class is not used.
     class Canvas(Component):
+        __slots__ = ()
+
         def __init__(self, position, **data):
             super(GUI.Canvas, self).__init__(position, **data)
 
@@ -2074,6 +4062,8 @@ class GUI(object):
         """Represents a input method editor's button.
         """
 
+        __slots__ = ('pressed', 'primary_text_component', 'secondary_text_component')
+
         def __init__(self, position, symbol, alt_symbol, **data):
             # type: (tuple, str, str, ...) -> None
             """KeyboardButton instance initializer.
@@ -2097,16 +4087,32 @@ class GUI(object):
                  self.computed_height - self.primary_text_component.computed_height - 1])
             self.add_child(self.primary_text_component)
             self.add_child(self.secondary_text_component)
-            self.blink_time = 0
+            self.pressed = False
             self.internal_click_overrides[GUI.CompEvt.on_click] = (self.register_blink, ())
             self.internal_click_overrides[GUI.CompEvt.on_longclick] = (self.register_blink, (True,))
 
+        # How long a pressed key stays highlighted, in milliseconds.
+        BLINK_DURATION = 250
+
         def register_blink(self, lp=False):
             # type: (bool) -> None
-            self.blink_time = state.gui.update_interval / 4
+            """Highlights the key, and schedules the highlight to end after BLINK_DURATION.
+            """
             self.primary_text_component.color = state.color_palette.get_color(GUI.Palette.background)
             self.secondary_text_component.color = state.color_palette.get_color(GUI.Palette.background)
             self.background_color = state.color_palette.get_color(GUI.Palette.accent if lp else GUI.Palette.item)
+            self.pressed = True
+            self.refresh()
+            self.invalidate_at(self.BLINK_DURATION, self.end_blink)
+
+        def end_blink(self):
+            # type: () -> None
+            """Restores the key colors after a press.
+            """
+            self.primary_text_component.color = state.color_palette.get_color(GUI.Palette.item)
+            self.secondary_text_component.color = state.color_palette.get_color(GUI.Palette.item)
+            self.background_color = state.color_palette.get_color(GUI.Palette.background)
+            self.pressed = False
             self.refresh()
 
         def get_clicked_child(self, mouse_event, offset_x=0, offset_y=0):
@@ -2122,19 +4128,16 @@ class GUI(object):
             """Renders the keyboard button.
             :param larger_surface: the surface to render onto.
             """
-            if self.blink_time >= 0:
-                self.blink_time -= 1
-                if self.blink_time < 0:
-                    self.primary_text_component.color = state.color_palette.get_color(GUI.Palette.item)
-                    self.secondary_text_component.color = state.color_palette.get_color(GUI.Palette.item)
-                    self.background_color = state.color_palette.get_color(GUI.Palette.background)
-                    self.refresh()
             super(GUI.KeyboardButton, self).render(larger_surface)
 
     class TextEntryField(Container):
         """Represents a box to input text.
         """
 
+        __slots__ = ('MULTILINE', 'advances', 'blink_interval', 'blink_on', 'do_blink', 'indicator_position',
+                     'indicator_px_position', 'blink_schedule', 'last_click_coord', 'measured_text', 'overflow',
+                     'text_component')
+
         def __init__(self, position, initial_text="", **data):
             # type: (tuple, str, ...) -> None
             """TextEntryField instance initializer.
@@ -2153,9 +4156,12 @@ class GUI(object):
                 self.blink_interval = 500
             self.do_blink = True
             self.blink_on = False
-            self.last_blink = datetime.now()
+            self.blink_schedule = None  # type: GUI.TimerService.Schedule
             self.indicator_position = len(initial_text)
             self.indicator_px_position = 0
+            # advances[i] is the width of the first i characters; rebuilt lazily from measured_text on edits.
+            self.advances = [0]  # type: list
+            self.measured_text = ""  # type: str
             super(GUI.TextEntryField, self).__init__(position, **data)
             self.SKIP_CHILD_CHECK = True
             self.text_component = GUI.Text((2, 0), initial_text, data["textColor"], 16, font=state.typing_font)
@@ -2167,6 +4173,26 @@ class GUI(object):
             self.internal_click_overrides[GUI.CompEvt.on_click] = (self.activate, ())
             self.internal_click_overrides[GUI.CompEvt.on_intermediate_updt] = (self.drag_scroll, ())
             self.overflow = max(self.text_component.computed_width - (self.computed_width - 4), 0)
+            self.start_blink()
+
+        def start_blink(self):
+            # type: () -> None
+            """Starts blinking the caret, if it is not blinking already.
+            """
+            self.do_blink = True
+            if self.blink_schedule is None:
+                self.blink_schedule = self.invalidate_every(self.blink_interval, self.toggle_blink)
+
+        def toggle_blink(self):
+            # type: () -> None
+            """Shows or hides the caret; called by the timer service every blink_interval.
+            """
+            if self.do_blink:
+                self.blink_on = not self.blink_on
+            else:
+                self.blink_on = False
+                self.cancel_invalidation(self.blink_schedule)
+                self.blink_schedule = None
 
         def clear_scroll_params(self):
             # type: () -> None
@@ -2183,37 +4209,75 @@ class GUI(object):
                     self.text_component.position[0] = 2 - self.overflow
                 else:
                     self.text_component.position[0] = 2
+                self.mark_dirty()
             self.last_click_coord = self._inner_click_coordinates
 
+        def get_advances(self):
+            # type: () -> list
+            """Returns the cumulative glyph advances of the text, updating them for the edit made since the last call.
+
+            Only the characters between the unchanged prefix and suffix are measured; the advances of the suffix are
+            shifted by the width difference.
+            """
+            text = self.text_component.text
+            old = self.measured_text
+            if text == old:
+                return self.advances
+            limit = min(len(text), len(old))
+            prefix = 0
+            while prefix < limit and text[prefix] == old[prefix]:
+                prefix += 1
+            suffix = 0
+            while suffix < limit - prefix and text[-1 - suffix] == old[-1 - suffix]:
+                suffix += 1
+            advances = self.advances[:prefix + 1]
+            width = advances[-1]
+            for char in text[prefix:len(text) - suffix]:
+                width += state.typing_font.measure(char, 16)
+                advances.append(width)
+            if suffix > 0:
+                delta = width - self.advances[len(old) - suffix]
+                advances.extend([x + delta for x in self.advances[len(old) - suffix + 1:]])
+            self.advances = advances
+            self.measured_text = text
+            return advances
+
         def get_px_position(self, from_pos=DEFAULT):
             # type: (int) -> int
-            """?
-            :param from_pos: ?
+            """Returns the horizontal offset of a caret position, in pixels.
+            :param from_pos: the caret position; defaults to the current one.
+            """
+            advances = self.get_advances()
+            position = self.indicator_position if from_pos == DEFAULT else from_pos
+            return advances[max(0, min(position, len(advances) - 1))]
+
+        def get_caret_at(self, x):
+            # type: (int) -> int
+            """Returns the caret position closest to a horizontal offset in the text.
+            :param x: the offset in pixels from the start of the text.
             """
-            return state.typing_font.get(16).render(
-                self.text_component.text[:(self.indicator_position if from_pos == DEFAULT else from_pos)], 1,
-                self.text_component.color).get_width()
+            advances = self.get_advances()
+            position = bisect_right(advances, x)
+            if position >= len(advances):
+                return len(advances) - 1
+            if position > 0 and x - advances[position - 1] < advances[position] - x:
+                return position - 1
+            return position
 
         def activate(self):
             # type: () -> GUI.TextEntryField
             self.clear_scroll_params()
             self.update_overflow()
-            state.keyboard = GUI.Keyboard(self)
+            if state.keyboard is None:
+                state.keyboard = GUI.Keyboard(self)
+            else:
+                state.keyboard.set_text_entry_field(self)
             if self.MULTILINE is not None:
-                for f in self.MULTILINE.textFields:
-                    f.doBlink = False
-            self.do_blink = True
+                for f in self.MULTILINE.text_fields:
+                    f.do_blink = False
+            self.start_blink()
             mouse_pos = self._inner_click_coordinates[0] - self.inner_offset[0]
-            if mouse_pos > self.text_component.computed_width:
-                self.indicator_position = len(self.text_component.text)
-            else:
-                prev_width = 0
-                for self.indicator_position in range(len(self.text_component.text)):
-                    curr_width = self.get_px_position(self.indicator_position)
-                    if mouse_pos >= prev_width and mouse_pos <= curr_width:
-                        self.indicator_position -= 1
-                        break
-                    prev_width = curr_width
+            self.indicator_position = self.get_caret_at(mouse_pos)
             state.keyboard.active = True
             self.indicator_px_position = self.get_px_position()
             if self.MULTILINE:
@@ -2229,6 +4293,7 @@ class GUI(object):
                 self.text_component.position[0] = 2 - self.overflow
             else:
                 self.text_component.position[0] = 2
+            self.mark_dirty()
 
         def append_char(self, char):
             # type: (str) -> None
@@ -2250,7 +4315,7 @@ class GUI(object):
                                                         self.text_component.text.rfind("-")):]
                     self.text_component.text = self.text_component.text.rstrip(newt)
                     self.MULTILINE.add_field(newt)
-                    self.MULTILINE.wrappedLines.append(self.MULTILINE.currentField)
+                    self.MULTILINE.wrapped_lines.append(self.MULTILINE.current_field)
                     # if self.MULTILINE.currentField == len(self.MULTILINE.textFields)-1:
                     #    self.MULTILINE.addField(newt)
                     # else:
@@ -2271,11 +4336,11 @@ class GUI(object):
                                                                        self.indicator_position + 1:]
                 self.text_component.refresh()
             else:
-                if self.MULTILINE is not None and self.MULTILINE.currentField > 0:
+                if self.MULTILINE is not None and self.MULTILINE.current_field > 0:
                     self.MULTILINE.remove_field(self)
-                    self.MULTILINE.textFields[self.MULTILINE.currentField - 1].append_char(
+                    self.MULTILINE.text_fields[self.MULTILINE.current_field - 1].append_char(
                         self.text_component.text.strip(" "))
-                    self.MULTILINE.textFields[self.MULTILINE.currentField - 1].activate()
+                    self.MULTILINE.text_fields[self.MULTILINE.current_field - 1].activate()
             self.update_overflow()
 
         def delete(self):
@@ -2309,19 +4374,16 @@ class GUI(object):
             # type: (pygame.Surface) -> None
             """Renders this entry field.
             """
+            self.dirty = False
             if not self.transparent:
                 self.surface.fill(self.background_color)
             else:
                 self.surface.fill((0, 0, 0, 0))
             for child in self.child_components:
                 child.render(self.surface)
-            if self.do_blink:
-                if ((datetime.now() - self.last_blink).microseconds / 1000) >= self.blink_interval:
-                    self.last_blink = datetime.now()
-                    self.blink_on = not self.blink_on
-                if self.blink_on:
-                    pygame.draw.rect(self.surface, self.text_component.color,
-                                     [self.indicator_px_position, 2, 2, self.computed_height - 4])
+            if self.do_blink and self.blink_on:
+                pygame.draw.rect(self.surface, self.text_component.color,
+                                 [self.indicator_px_position, 2, 2, self.computed_height - 4])
             super(GUI.Container, self).render(larger_surface)
 
         def get_clicked_child(self, mouse_event, offset_x=0, offset_y=0):
@@ -2333,6 +4395,8 @@ class GUI(object):
             return None
 
     class PagedContainer(Container):
+        __slots__ = ('current_page', 'hide_controls', 'page_controls', 'page_holder', 'page_indicator_text',
+                     'page_left_button', 'page_right_button', 'pages')
 
         def __init__(self, position, **data):
             # type: (tuple, ...) -> None
@@ -2474,6 +4538,8 @@ class GUI(object):
         """Represents a PagedContainer with grid layout.
         """
 
+        __slots__ = ('columns', 'padding', 'per_column', 'per_row', 'rows')
+
         def __init__(self, position, rows=5, columns=4, **data):
             # type: (tuple, int, int, ...) -> None
             """GriddedPagedContainer instance initializer.
@@ -2523,6 +4589,8 @@ class GUI(object):
         """Represents a PagedContainer with list layout.
         """
 
+        __slots__ = ('margin', 'padding')
+
         def __init__(self, position, **data):
             # type: (tuple, ...) -> None
             """ListPagedContainer instance initializer.
@@ -2541,7 +4609,7 @@ class GUI(object):
             if len(self.pages) == 0:
                 return self.padding
             for component in self.get_last_page().child_components:
-                height += component.computedHeight + (2 * self.margin)
+                height += component.computed_height + (2 * self.margin)
             return height
 
         def add_child(self, component):
@@ -2570,6 +4638,8 @@ class GUI(object):
         """Represents a sequence of adjacent buttons.
         """
 
+        __slots__ = ('margin', 'padding')
+
         def __init__(self, position, **data):
             # type: (tuple, ...) -> None
             """ButtonRow instance initializer.
@@ -2616,6 +4686,8 @@ class GUI(object):
         """TODO: describe it.
         """
 
+        __slots__ = ('color', 'last_click_coord', 'pct', 'scroll_container', 'sih', 'slide')
+
         def __init__(self, scroll_cont, position, color, **data):
             # type: (GUI.ScrollableContainer, tuple, tuple, ...) -> None
             """ScrollIndicator instance initializer.
@@ -2643,6 +4715,7 @@ class GUI(object):
                 self.scroll_container.max_offset - self.scroll_container.min_offset)
             self.slide = -self.scroll_container.offset * self.pct
             self.sih = self.pct * self.computed_height
+            self.mark_dirty()
 
         def render(self, larger_surface):
             # type: (pygame.Surface) -> None
@@ -2674,6 +4747,9 @@ class GUI(object):
         view the contents that does not fit entirely in its bounds.
         """
 
+        __slots__ = ('container', 'max_offset', 'min_offset', 'offset', 'scroll_amount', 'scroll_bar', 'scroll_downbtn',
+                     'scroll_indicator', 'scroll_upbtn')
+
         def __init__(self, position, **data):
             # type: (tuple, ...) -> None
             """ScrollableContainer instance initializer.
@@ -2716,9 +4792,17 @@ class GUI(object):
                 if self.offset + amount > self.min_offset:
                     # self.offset = -self.minOffset
                     return
-            for child in self.container.child_components:
-                child.position[1] = child.computedPosition[1] + amount
             self.offset += amount
+            self.update_viewport()
+
+        def update_viewport(self):
+            # type: () -> None
+            """Shows the contents at the current offset.
+
+            Children keep their coordinates; the offset is only applied when the inner container composes them.
+            """
+            self.container.view_offset = (0, -self.offset)
+            self.container.mark_dirty()
             self.scroll_indicator.update()
 
         def get_visible_children(self):
@@ -2726,9 +4810,10 @@ class GUI(object):
             """Returns all child components that are not out of view.
             """
             visible = []
+            view_top = -self.offset
             for child in self.container.child_components:
-                if (child.computedPosition[1] + child.computedHeight >= -10 and
-                        child.computedPosition[1] - child.computedHeight <= self.computed_height + 10):
+                if (child.computed_position[1] + child.computed_height >= view_top - 10 and
+                        child.computed_position[1] - child.computed_height <= view_top + self.computed_height + 10):
                     visible.append(child)
             return visible
 
@@ -2740,25 +4825,14 @@ class GUI(object):
                                                         offset_y + self.computed_position[1])
             if clicked is not None:
                 return clicked
-            visible = self.get_visible_children()
-            for child in reversed(visible[:]):
-                if hasattr(child, "SKIP_CHILD_CHECK"):
-                    if child.SKIP_CHILD_CHECK:
-                        if child.check_click(mouse_event, offset_x + self.computed_position[0],
-                                             offset_y + self.computed_position[1]):
-                            return child
-                        else:
-                            continue
-                    else:
-                        sub_check = child.get_clicked_child(mouse_event, offset_x + self.computed_position[0],
-                                                            offset_y + self.computed_position[1])
-                        if sub_check is None:
-                            continue
-                        return sub_check
-                else:
-                    if child.check_click(mouse_event, offset_x + self.computed_position[0],
-                                         offset_y + self.computed_position[1]):
-                        return child
+            container_offset_x = offset_x + self.computed_position[0]
+            container_offset_y = offset_y + self.computed_position[1]
+            child_offset_x = container_offset_x + self.container.computed_position[0] - self.container.view_offset[0]
+            child_offset_y = container_offset_y + self.container.computed_position[1] - self.container.view_offset[1]
+            for child in self.container.get_hit_candidates(mouse_event, container_offset_x, container_offset_y):
+                clicked = GUI.Container.get_clicked_descendant(child, mouse_event, child_offset_x, child_offset_y)
+                if clicked is not None:
+                    return clicked
             if self.check_click(mouse_event, offset_x, offset_y):
                 return self
             return None
@@ -2798,7 +4872,7 @@ class GUI(object):
             self.container.clear_children()
             self.max_offset = self.computed_height
             self.offset = 0
-            self.scroll_indicator.update()
+            self.update_viewport()
 
         def render(self, larger_surface):
             # type: (pygameSurface) -> None
@@ -2826,6 +4900,8 @@ class GUI(object):
         """Represents a scrollable container that behaves as a list.
         """
 
+        __slots__ = ('margin',)
+
         def __init__(self, position, **data):
             # type: (tuple, ...) -> None
             """ListScrollableContainer instance initializer.
@@ -2864,10 +4940,152 @@ class GUI(object):
             for child in children_copy:
                 self.add_child(child)
 
+    class VirtualListContainer(ScrollableContainer):
+        """Represents a scrollable list that only builds the rows in view and recycles them while scrolling.
+        """
+
+        __slots__ = ('count', 'margin', 'overscan', 'row_binder', 'row_factory', 'row_height', 'row_measurer',
+                     'row_pool', 'row_tops', 'rows')
+
+        def __init__(self, position, count=0, row_factory=None, row_binder=None, **data):
+            # type: (tuple, int, callable, callable, ...) -> None
+            """VirtualListContainer instance initializer.
+            :param position: the list position
+            :param count: the number of rows in the list
+            :param row_factory: called without arguments to build a new row component
+            :param row_binder: called with (row, index) to show the item at index in a row
+            :param data: optional data related to the list, such as rowHeight (fixed row height), rowMeasurer
+            (a callable returning the height of the row at an index), overscan (rows kept beyond each edge of the
+            view) and margin (the spacing between rows).
+            """
+            self.count = count  # type: int
+            self.row_factory = row_factory  # type: callable
+            self.row_binder = row_binder  # type: callable
+            self.row_height = data.get("rowHeight", 40)  # type: int
+            self.row_measurer = data.get("rowMeasurer", None)  # type: callable
+            self.overscan = data.get("overscan", 2)  # type: int
+            self.margin = data.get("margin", 0)  # type: int
+            self.rows = {}  # type: dict
+            self.row_pool = []  # type: list
+            self.row_tops = None  # type: list
+            super(GUI.VirtualListContainer, self).__init__(position, **data)
+            self.update_layout()
+
+        def get_row_top(self, index):
+            # type: (int) -> int
+            """Returns the vertical position of a row within the list.
+            """
+            if self.row_tops is not None:
+                return self.row_tops[index]
+            return index * (self.row_height + self.margin)
+
+        def get_row_at(self, y):
+            # type: (int) -> int
+            """Returns the index of the row at a vertical position within the list.
+            """
+            if self.row_tops is not None:
+                return max(0, bisect_right(self.row_tops, y) - 1)
+            return max(0, int(y // (self.row_height + self.margin)))
+
+        def get_cumulative_height(self):
+            # type: () -> int
+            """Returns the vertical length in pixels of the list.
+            """
+            if self.row_tops is not None:
+                return self.row_tops[-1]
+            return self.count * (self.row_height + self.margin)
+
+        def update_layout(self):
+            # type: () -> None
+            """Recomputes the row positions and rebinds the rows in view, after the count or the row heights changed.
+            """
+            if self.row_measurer is not None:
+                self.row_tops = [0]
+                for index in range(self.count):
+                    self.row_tops.append(self.row_tops[-1] + self.row_measurer(index) + self.margin)
+            else:
+                self.row_tops = None
+            self.min_offset = 0
+            self.max_offset = max(self.get_cumulative_height(), self.computed_height)
+            self.offset = min(0, max(self.offset, self.computed_height - self.max_offset))
+            self.update_rows(True)
+            self.update_viewport()
+
+        def update_rows(self, rebind=False):
+            # type: (bool) -> None
+            """Builds or recycles the rows that fall in view, plus the overscan.
+            :param rebind: True to bind again the rows that stay in view.
+            """
+            first = max(0, self.get_row_at(-self.offset) - self.overscan)
+            last = min(self.count, self.get_row_at(self.computed_height - self.offset) + 1 + self.overscan)
+            for index in [index for index in self.rows if index < first or index >= last]:
+                row = self.rows.pop(index)
+                self.container.remove_child(row)
+                self.row_pool.append(row)
+            for index in range(first, last):
+                row = self.rows.get(index)
+                if row is None:
+                    row = self.row_pool.pop() if self.row_pool else self.row_factory()
+                    self.row_binder(row, index)
+                    self.rows[index] = row
+                    self.container.add_child(row)
+                elif rebind:
+                    self.row_binder(row, index)
+                top = self.get_row_top(index)
+                if row.position[1] != top or row.computed_position[1] != top:
+                    row.position[1] = top
+                    row.set_dimensions()
+
+        def set_count(self, count):
+            # type: (int) -> None
+            """Sets the number of rows and rebinds the rows in view.
+            """
+            self.count = count
+            self.update_layout()
+
+        def scroll(self, amount):
+            # type: (int) -> None
+            """Scrolls the list, stopping at either end.
+            :param amount: the scrolling amount in pixels
+            """
+            offset = min(0, max(self.offset + amount, self.computed_height - self.max_offset))
+            if offset == self.offset:
+                return
+            self.offset = offset
+            self.update_rows()
+            self.update_viewport()
+
+        def scroll_to(self, index):
+            # type: (int) -> None
+            """Scrolls the list so the row at index is at the top of the view.
+            """
+            self.scroll(-self.get_row_top(index) - self.offset)
+
+        def add_child(self, component):
+            # type: (GUI.Component) -> None
+            """Rows are built by the row factory; use set_count to change the list contents.
+            """
+            raise TypeError("VirtualListContainer rows come from its row_factory; use set_count instead.")
+
+        def clear_children(self):
+            # type: () -> None
+            """Removes every row.
+            """
+            self.set_count(0)
+
+        def refresh(self, children=True):
+            # type: (bool) -> None
+            """Updates the list after a change of its bounds.
+            """
+            super(GUI.VirtualListContainer, self).refresh(children)
+            self.update_layout()
+
     class TextScrollableContainer(ScrollableContainer):
         """Represents a scrollable container suited for long pieces of text.
         """
 
+        __slots__ = ('text_component',)
+
         def __init__(self, position, text_component=None, **data):
             # type: (tuple, GUI.ExpandingMultiLineText, ...) -> None
             """TextScrollableContainer instance initializer.
@@ -2899,6 +5117,8 @@ class GUI(object):
         """Represents a multiline text field the behaves like a list scrollable.
         """
 
+        __slots__ = ('current_field', 'line_height', 'max_lines', 'text_color', 'text_fields', 'wrapped_lines')
+
         def __init__(self, position, initial_text="", **data):
             # type: (tuple, str, ...) -> None
             """MultiLineTextEntryField instance initializer.
@@ -2988,8 +5208,9 @@ class GUI(object):
             if cur_field < len(self.text_fields) - 1:
                 c = ""
                 try:
-                    c = self.text_fields[nxt_field].text_component.text[0]
-                    self.text_fields[nxt_field].text_component.text = self.text_fields[nxt_field].textComponent.text[1:]
+                    next_text = self.text_fields[nxt_field].text_component
+                    c = next_text.text[0]
+                    next_text.text = next_text.text[1:]
                     self.text_fields[nxt_field].update_overflow()
                     self.text_fields[nxt_field].refresh()
                 except COMMON_EXCEPTIONS:
@@ -3003,7 +5224,7 @@ class GUI(object):
             """
             t = ""
             p = 0
-            for ftext in [f.getText() for f in self.text_fields]:
+            for ftext in [f.get_text() for f in self.text_fields]:
                 if p in self.wrapped_lines:
                     t += ftext
                 else:
@@ -3042,7 +5263,7 @@ class GUI(object):
                             self.wrapped_lines.append(n)
                 for field in self.text_fields:
                     if field.overflow > 0:
-                        field.textComponent.set_text(field.textComponent.text.rstrip(" "))
+                        field.text_component.set_text(field.text_component.text.rstrip(" "))
                         field.updateOverflow()
             self.refresh()
             state.keyboard.deactivate()
@@ -3057,7 +5278,7 @@ class GUI(object):
             """
             self.container = GUI.Container((0, state.gui.height - 40),
                                            background=state.color_palette.get_color(GUI.Palette.background),
-                                           width=state.gui.width, height=40)
+                                           width=state.gui.width, height=40, screenRoot=True)
             self.launcher_app = state.application_list.get_app("launcher")
             self.notification_menu = GUI.NotificationMenu()
             self.recent_app_switcher = GUI.RecentAppSwitcher()
@@ -3072,6 +5293,16 @@ class GUI(object):
             self.container.add_child(self.menu_button)
             self.container.add_child(self.app_title_text)
             self.container.add_child(self.clock_text)
+            self.clock_text.invalidate_every(60000, self.update_clock, aligned=True)
+
+        def update_clock(self):
+            # type: () -> None
+            """Shows the current time; called by the timer service as the minute changes.
+            """
+            time_stamp = self.format_time()
+            if self.clock_text.text != time_stamp:
+                self.clock_text.text = time_stamp
+                self.clock_text.refresh()
 
         def format_time(self):
             # type: () -> str
@@ -3084,14 +5315,19 @@ class GUI(object):
             # if time.startswith("0"): time = time[1:]
             # return time[time.find(" ") + 1:time.find(":", time.find(":") + 1)]
 
+        def update(self):
+            # type: () -> None
+            """Highlights the clock when there are new notifications.
+            """
+            if state.notification_queue.new and self.clock_text.color != (255, 59, 59):
+                self.clock_text.color = (255, 59, 59)
+                self.clock_text.refresh()
+
         def render(self):
             # type: () -> None
             """Renders the funtion bar.
             """
-            if state.notification_queue.new:
-                self.clock_text.color = (255, 59, 59)
-            self.clock_text.text = self.format_time()
-            self.clock_text.refresh()
+            self.update()
             self.container.render(screen)
 
         def activate_launcher(self):
@@ -3121,8 +5357,39 @@ class GUI(object):
             else:
                 self.recent_app_switcher.display()
 
+    class KeyboardContainer(Container):
+        """The keyboard's base container, composed from the keyboard's prerendered atlases.
+        """
+
+        __slots__ = ('keyboard',)
+
+        def __init__(self, keyboard, position, **data):
+            # type: (GUI.Keyboard, tuple, ...) -> None
+            """KeyboardContainer instance initializer.
+            :param keyboard: the keyboard owning the keys.
+            :param position: the container position.
+            :param data: optional data related to the container.
+            """
+            self.keyboard = keyboard
+            super(GUI.KeyboardContainer, self).__init__(position, **data)
+
+        def compose(self):
+            # type: () -> None
+            """Overrides Container.compose; blits the atlas for the current case, then the keys being pressed.
+            """
+            if self.dirty:
+                self.dirty = False
+                self.surface.blit(self.keyboard.get_atlas(self.keyboard.shift_up), (0, 0))
+                for button in self.child_components:
+                    if button.pressed:
+                        button.render(self.surface)
+
     class Keyboard(object):
         """Represents the input method editor.
+
+        A single keyboard is kept in state.keyboard and rebound to each entry field that gets focus. The key faces
+        are prerendered in both cases into atlases, one pair per color scheme, so showing the keyboard and toggling
+        shift only blit them.
         """
 
         def __init__(self, text_entry_field=None):
@@ -3132,14 +5399,13 @@ class GUI(object):
             """
             self.shift_up = False
             self.active = False
-            self.text_entry_field = text_entry_field
+            self.text_entry_field = None  # type: GUI.TextEntryField
             self.moved_ui = False
+            self.atlases = None  # type: dict
+            self.scheme = state.color_palette.scheme  # type: str
             self._symbol_font = GUI.Font("res/symbols.ttf", 10, 20)
-            if self.text_entry_field.computed_position[1] + self.text_entry_field.computed_height > 2 * (
-                        state.gui.height / 3) or self.text_entry_field.data.get("slideUp", False):
-                state.active_application.ui.set_position((0, -80))
-                self.moved_ui = True
-            self.base_container = GUI.Container((0, 0), width=state.gui.width, height=state.gui.height / 3)
+            self.base_container = GUI.KeyboardContainer(self, (0, 0), width=state.gui.width,
+                                                        height=state.gui.height / 3, screenRoot=True)
             self.base_container.set_position((0, 2 * (state.gui.height / 3)))
             self.key_width = self.base_container.computed_width / 10
             self.key_height = self.base_container.computed_height / 4
@@ -3198,6 +5464,61 @@ class GUI(object):
                     self.base_container.add_child(button)
                     sym += 1
                 row += 1
+            if text_entry_field is not None:
+                self.set_text_entry_field(text_entry_field)
+
+        def set_case(self, upper):
+            # type: (bool) -> None
+            """Changes the case of the key labels, without rendering them.
+            """
+            for button in self.base_container.child_components:
+                text_component = button.primary_text_component
+                text_component.text = text_component.text.upper() if upper else text_component.text.lower()
+                text_component._original_text = text_component.text
+
+        def apply_scheme(self):
+            # type: () -> None
+            """Recolors the keys for the current color scheme, without rendering them.
+            """
+            palette = state.color_palette
+            self.base_container.background_color = palette.get_color(GUI.Palette.background)
+            special_keys = (self.shift_sym, self.enter_sym, self.bkspc_sym, self.delet_sym)
+            for button in self.base_container.child_components:
+                button.end_blink()
+                button.border_color = palette.get_color(
+                    GUI.Palette.accent if button.primary_text_component.text in special_keys else GUI.Palette.item)
+            self.scheme = palette.scheme
+
+        def get_atlas(self, upper):
+            # type: (bool) -> pygame.Surface
+            """Returns the keyboard face in the given case and the current color scheme, prerendering both cases the
+            first time the scheme is used.
+            """
+            if self.atlases is None:
+                self.atlases = {}
+            scheme = state.color_palette.scheme
+            if (scheme, upper) not in self.atlases:
+                if self.scheme != scheme:
+                    self.apply_scheme()
+                surface = self.base_container.surface
+                for case in (False, True):
+                    self.set_case(case)
+                    surface.fill(self.base_container.background_color)
+                    for button in self.base_container.child_components:
+                        button.refresh()
+                        button.render(surface)
+                    self.atlases[(scheme, case)] = surface.copy()
+                self.set_case(self.shift_up)
+            elif self.scheme != scheme:
+                self.apply_scheme()
+            return self.atlases[(scheme, upper)]
+
+        def clear_atlases(self):
+            # type: () -> None
+            """Drops the prerendered key faces, e.g. after the palette colors were edited.
+            """
+            self.atlases = None
+            self.base_container.mark_dirty()
 
         def deactivate(self):
             # type: () -> None
@@ -3207,6 +5528,7 @@ class GUI(object):
             if self.moved_ui:
                 state.active_application.ui.position[1] = 0
             self.text_entry_field = None
+            state.gui.invalidate()
 
         def set_text_entry_field(self, field):
             # type: (GUI.TextEntryField) -> None
@@ -3214,11 +5536,15 @@ class GUI(object):
             """
             self.text_entry_field = field
             self.active = True
+            state.gui.invalidate()
             if (self.text_entry_field.computed_position[1] + self.text_entry_field.height >
                     state.gui.height - self.base_container.computed_height or
                     self.text_entry_field.data.get("slideUp", False)):
                 state.active_application.ui.set_position((0, -self.base_container.computed_height))
                 self.moved_ui = True
+            elif self.moved_ui:
+                state.active_application.ui.position[1] = 0
+                self.moved_ui = False
 
         def get_entered_text(self):
             # type: () -> str
@@ -3232,18 +5558,14 @@ class GUI(object):
             """
             if char == self.shift_sym:
                 self.shift_up = not self.shift_up
-                for button in self.base_container.child_components:
-                    if self.shift_up:
-                        button.primary_text_component.text = button.primary_text_component.text.upper()
-                    else:
-                        button.primary_text_component.text = button.primary_text_component.text.lower()
-                    button.primary_text_component.refresh()
+                self.set_case(self.shift_up)
+                self.base_container.mark_dirty()
 
             elif char == self.enter_sym:
                 mult = self.text_entry_field.MULTILINE
                 self.deactivate()
                 if mult is not None:
-                    mult.text_fields[mult.currentField].do_blink = False
+                    mult.text_fields[mult.current_field].do_blink = False
                     mult.add_field("")
 
             elif char == self.bkspc_sym:
@@ -3256,9 +5578,8 @@ class GUI(object):
                 if self.shift_up:
                     self.text_entry_field.append_char(char.upper())
                     self.shift_up = False
-                    for button in self.base_container.child_components:
-                        button.primary_text_component.text = button.primary_text_component.text.lower()
-                        button.primary_text_component.refresh()
+                    self.set_case(False)
+                    self.base_container.mark_dirty()
                 else:
                     self.text_entry_field.append_char(char)
 
@@ -3307,7 +5628,6 @@ class GUI(object):
             """Hides the overlay
             """
             self.application.ui.clear_dialog()
-            self.application.ui.refresh()
             self.displayed = False
 
         def add_child(self, child):
@@ -3369,7 +5689,6 @@ class GUI(object):
             """
             state.function_bar.app_title_text.set_text(state.active_application.title)
             self.application.ui.clear_dialog()
-            self.application.ui.refresh()
 
         def record_response(self, response):
             # type: (Any) -> None
@@ -3592,6 +5911,7 @@ class GUI(object):
             self.refresh()
             state.notification_queue.new = False
             state.function_bar.clock_text.color = state.color_palette.get_color(GUI.Palette.accent)
+            state.function_bar.clock_text.refresh()
             super(GUI.NotificationMenu, self).display()
 
         def clear_all(self):
@@ -3692,6 +6012,9 @@ class GUI(object):
     class Selector(Container):
         """?
         """
+
+        __slots__ = ('current_item', 'items', 'on_value_changed', 'on_value_changed_data', 'overlay', 'scroller',
+                     'text_color', 'text_component')
         def __init__(self, position, items, **data):
             self.on_value_changed = data.get("onValueChanged", Application.dummy)
             self.on_value_changed_data = data.get("onValueChangedData", ())
@@ -3958,10 +6281,9 @@ class Application(object):
             if app_event in self.parameters:
                 self.evt_handlers[app_event] = getattr(self._module, self.parameters[app_event])
 
-        self.thread = Thread(self.main_method, **self.evt_handlers)
         self.ui = GUI.AppContainer(self)
         self.dataStore = DataStore(self)
-        self.thread = Thread(self.main_method, **self.evt_handlers)
+        self.thread = self.create_thread()
 
     @property
     def module(self):
@@ -3970,6 +6292,13 @@ class Application(object):
         """
         return self._module
 
+    def create_thread(self):
+        # type: () -> Thread
+        """Creates the thread running the application's main method, at the "tickRate" declared in app.json.
+        """
+        return Thread(self.main_method, tickRate=self.parameters.get("tickRate"),
+                      priority=ThreadPriority.background, **self.evt_handlers)
+
     def chain_refresh(self):
         # type: () -> None
         """Updates the application interface.
@@ -3993,6 +6322,8 @@ class Application(object):
             state.color_palette.scheme = self.parameters["colorScheme"]
         else:
             state.color_palette.scheme = GUI.Scheme.normal
+        if state.keyboard is not None and state.keyboard.scheme != state.color_palette.scheme:
+            state.keyboard.base_container.mark_dirty()
         self.ui.background_color = state.color_palette.get_color(GUI.Palette.background)
         self.ui.refresh()
 
@@ -4014,8 +6345,9 @@ class Application(object):
                 self.thread.set_pause(False)
             else:
                 if self.thread.stop:
-                    self.thread = Thread(self.main_method, **self.evt_handlers)
+                    self.thread = self.create_thread()
                 state.thread_controller.add_thread(self.thread)
+            self.thread.priority = ThreadPriority.foreground
         except COMMON_EXCEPTIONS:
             State.error_recovery("Application init error.", "App name: " + self.name)
 
@@ -4037,11 +6369,15 @@ class Application(object):
         if "persist" in self.parameters:
             if self.parameters["persist"] is False:
                 pause = False
+        self.thread.priority = ThreadPriority.background
         if pause:
             self.thread.set_pause(True)
         else:
             self.ui.clear_children()
             self.thread.set_stop()
+            for pool in (state.thread_controller.worker_pool, state.thread_controller.process_pool,
+                         state.thread_controller.async_loop):
+                pool.cancel_owner(self)
             state.application_list.close_app(self)
         state.color_palette.scheme = GUI.Scheme.normal
 
@@ -4246,10 +6582,14 @@ class NotificationQueue(object):
 
     def push(self, notification):
         # type: (Notification) -> None
-        """Adds a new notification.
+        """Adds a new notification; it can be called from any thread.
         """
+        if not state.gui.is_ui_thread():
+            state.call_soon(self.push, notification)
+            return
         self.notifications.insert(0, notification)
         self.new = True
+        state.gui.wake()
 
     def clear(self):
         # type: () -> None
@@ -4307,11 +6647,15 @@ class DataStore(object):
 
 
 class State(object):
+    # Time, in milliseconds, a frame may spend on calls queued with call_soon before the rest waits a frame.
+    UI_CALL_BUDGET = 8
+
     def __init__(self, active_app=None, colors=None, icons=None, controller=None, event_queue=None,
                  notification_queue=None, functionbar=None, font=None, t_font=None, gui=None, app_list=None,
-                 keyboard=None):
+                 keyboard=None, text_cache=None, asset_cache=None, timer_service=None, compositor=None):
         # type: (Application, GUI.ColorPalette, GUI.Icons, Controller, GUI.EventQueue, NotificationQueue,
-        #  GUI.FunctionBar, GUI.Font, GUI.Font, GUI, ApplicationList, GUI.Keyboard) -> None
+        #  GUI.FunctionBar, GUI.Font, GUI.Font, GUI, ApplicationList, GUI.Keyboard, GUI.TextCache,
+        #  GUI.AssetCache, GUI.TimerService, GUI.Compositor) -> None
         """State instance initializer.
         :param active_app: the active application.
         :param colors: the color theme
@@ -4325,6 +6669,10 @@ class State(object):
         :param gui: que GUI toolkit
         :param app_list: the application list
         :param keyboard: the input method editor
+        :param text_cache: the cache of rendered text surfaces
+        :param asset_cache: the cache of decoded icons and images
+        :param timer_service: the clock driving scheduled repaints
+        :param compositor: the compositor that layers the user interface on screen
         """
         self._active_application = active_app
         self._color_palette = colors
@@ -4337,7 +6685,13 @@ class State(object):
         self._typing_font = t_font
         self._app_list = app_list
         self._keyboard = keyboard
+        self._text_cache = text_cache
+        self._asset_cache = asset_cache
+        self._timer_service = timer_service
+        self._compositor = compositor
+        self._gui = gui
         self._recent_app_switcher = None
+        self._ui_calls = deque()  # type: deque
         if gui is None:
             self._gui = GUI()
         if colors is None:
@@ -4354,6 +6708,16 @@ class State(object):
             self._font = GUI.Font()
         if t_font is None:
             self._typing_font = GUI.Font("res/RobotoMono-Regular.ttf")
+        self._thread_controller.add_thread(GeneratorTask(GUI.Font.prewarm))
+        if text_cache is None:
+            # Budget two full screens of 32 bit pixels, so larger panels get a larger cache.
+            self._text_cache = GUI.TextCache(2 * self._gui.width * self._gui.height * 4)
+        if asset_cache is None:
+            self._asset_cache = GUI.AssetCache(4 * self._gui.width * self._gui.height * 4)
+        if timer_service is None:
+            self._timer_service = GUI.TimerService()
+        if compositor is None:
+            self._compositor = GUI.Compositor()
 
     @property
     def active_application(self):
@@ -4465,6 +6829,111 @@ class State(object):
         # type: (GUI.Font) -> None
         self._typing_font = value
 
+    @property
+    def text_cache(self):
+        # type: () -> GUI.TextCache
+        """Gets or sets the cache of rendered text surfaces.
+        """
+        return self._text_cache
+
+    @text_cache.setter
+    def text_cache(self, value):
+        # type: (GUI.TextCache) -> None
+        self._text_cache = value
+
+    @property
+    def asset_cache(self):
+        # type: () -> GUI.AssetCache
+        """Gets or sets the cache of decoded icons and images.
+        """
+        return self._asset_cache
+
+    @asset_cache.setter
+    def asset_cache(self, value):
+        # type: (GUI.AssetCache) -> None
+        self._asset_cache = value
+
+    @property
+    def timer_service(self):
+        # type: () -> GUI.TimerService
+        """Gets or sets the clock driving scheduled repaints.
+        """
+        return self._timer_service
+
+    @timer_service.setter
+    def timer_service(self, value):
+        # type: (GUI.TimerService) -> None
+        self._timer_service = value
+
+    @property
+    def compositor(self):
+        # type: () -> GUI.Compositor
+        """Gets or sets the compositor that layers the user interface on screen.
+        """
+        return self._compositor
+
+    @compositor.setter
+    def compositor(self, value):
+        # type: (GUI.Compositor) -> None
+        self._compositor = value
+
+    def call_soon(self, method, *args):
+        # type: (callable, ...) -> None
+        """Queues a call to run on the UI loop, on the next frame. Safe to use from any thread.
+
+        Background work must change components this way, since the UI loop may be rendering them at the time.
+        :param method: the callable to run.
+        :param args: the arguments for method.
+        """
+        self._ui_calls.append((method, args))
+        self._gui.wake()
+
+    def run_on_ui_thread(self, method, *args):
+        # type: (callable, ...) -> None
+        """Runs a call right away on the UI loop's thread, or queues it with call_soon from any other thread.
+        """
+        if self._gui.is_ui_thread():
+            method(*args)
+        else:
+            self.call_soon(method, *args)
+
+    @property
+    def has_ui_calls(self):
+        # type: () -> bool
+        """Gets whether calls are waiting to run on the UI loop.
+        """
+        return len(self._ui_calls) > 0
+
+    @staticmethod
+    def run_ui_calls():
+        # type: () -> None
+        """Runs the calls queued with call_soon, oldest first, until none are left or UI_CALL_BUDGET runs out.
+        """
+        calls = state._ui_calls
+        deadline = pygame.time.get_ticks() + State.UI_CALL_BUDGET
+        while len(calls) > 0:
+            method, args = calls.popleft()
+            try:
+                method(*args)
+            except COMMON_EXCEPTIONS:
+                State.error_recovery("UI call error.", str(method))
+            if pygame.time.get_ticks() >= deadline:
+                return
+
+    def run_coroutine(self, coroutine, callback=None):
+        # type: (Any, callable) -> Future
+        """Runs a coroutine on the shared asyncio loop, on behalf of the active application.
+
+        The coroutine is cancelled if the application is closed first.
+        :param coroutine: the coroutine object to run.
+        :param callback: called with the Future on the UI loop once the coroutine has finished.
+        :return: the Future of the coroutine.
+        """
+        future = self._thread_controller.async_loop.submit(coroutine, (), self._active_application)
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
     @property
     def gui(self):
         # type: () -> GUI
@@ -4513,6 +6982,7 @@ class State(object):
     @staticmethod
     def exit():
         state.thread_controller.stop_all_threads()
+        GUI.Font.save_usage()
         pygame.quit()
         # NOTE: changed in 1.01 - relace os._exit() by sys.exit()
         sys.exit(1)
@@ -4525,57 +6995,61 @@ class State(object):
         state.notification_queue.clear()
         state.event_queue.clear()
         print("Recovery menu entered.")
-        while True:
-            r_clock.tick(10)
-            screen.fill([0, 0, 0])
-            pygame.draw.rect(screen, [200, 200, 200], [0, 0, 280, 80])
-            screen.blit(r_fnt.render("Return to Python OS", 1, [20, 20, 20]), [40, 35])
-            pygame.draw.rect(screen, [20, 200, 20], [0, 80, 280, 80])
-            screen.blit(r_fnt.render("Stop all apps and return", 1, [20, 20, 20]), [40, 115])
-            pygame.draw.rect(screen, [20, 20, 200], [0, 160, 280, 80])
-            screen.blit(r_fnt.render("Stop current app and return", 1, [20, 20, 20]), [40, 195])
-            pygame.draw.rect(screen, [200, 20, 20], [0, 240, 280, 80])
-            screen.blit(r_fnt.render("Exit completely", 1, [20, 20, 20]), [40, 275])
-            pygame.display.flip()
-            for evt in pygame.event.get():
-                if evt.type == pygame.QUIT or evt.type == pygame.KEYDOWN and evt.key == pygame.K_ESCAPE:
-                    print("Quit signal detected.")
-                    try:
-                        state.exit()
-                    except COMMON_EXCEPTIONS:
-                        pygame.quit()
-                        exit()
-                if evt.type == pygame.MOUSEBUTTONDOWN:
-                    if evt.pos[1] >= 80:
-                        if evt.pos[1] >= 160:
-                            if evt.pos[1] >= 240:
-                                print("Exiting.")
-                                try:
-                                    state.exit()
-                                except COMMON_EXCEPTIONS:
-                                    pygame.quit()
-                                    exit()
+        try:
+            while True:
+                r_clock.tick(10)
+                screen.fill([0, 0, 0])
+                pygame.draw.rect(screen, [200, 200, 200], [0, 0, 280, 80])
+                screen.blit(r_fnt.render("Return to Python OS", 1, [20, 20, 20]), [40, 35])
+                pygame.draw.rect(screen, [20, 200, 20], [0, 80, 280, 80])
+                screen.blit(r_fnt.render("Stop all apps and return", 1, [20, 20, 20]), [40, 115])
+                pygame.draw.rect(screen, [20, 20, 200], [0, 160, 280, 80])
+                screen.blit(r_fnt.render("Stop current app and return", 1, [20, 20, 20]), [40, 195])
+                pygame.draw.rect(screen, [200, 20, 20], [0, 240, 280, 80])
+                screen.blit(r_fnt.render("Exit completely", 1, [20, 20, 20]), [40, 275])
+                pygame.display.flip()
+                for evt in pygame.event.get():
+                    if evt.type == pygame.QUIT or evt.type == pygame.KEYDOWN and evt.key == pygame.K_ESCAPE:
+                        print("Quit signal detected.")
+                        try:
+                            state.exit()
+                        except COMMON_EXCEPTIONS:
+                            pygame.quit()
+                            exit()
+                    if evt.type == pygame.MOUSEBUTTONDOWN:
+                        if evt.pos[1] >= 80:
+                            if evt.pos[1] >= 160:
+                                if evt.pos[1] >= 240:
+                                    print("Exiting.")
+                                    try:
+                                        state.exit()
+                                    except COMMON_EXCEPTIONS:
+                                        pygame.quit()
+                                        exit()
+                                else:
+                                    print("Stopping current app")
+                                    try:
+                                        Application.full_close_current()
+                                    except COMMON_EXCEPTIONS:
+                                        print("Regular stop failed!")
+                                        Application.set_active_app(state.application_list.get_app("home"))
+                                    return
                             else:
-                                print("Stopping current app")
-                                try:
-                                    Application.full_close_current()
-                                except COMMON_EXCEPTIONS:
-                                    print("Regular stop failed!")
-                                    Application.set_active_app(state.application_list.get_app("home"))
+                                print("Closing all active applications")
+                                for a in state.application_list.active_applications:
+                                    try:
+                                        a.deactivate()
+                                    except COMMON_EXCEPTIONS:
+                                        print("The app {} failed to deactivate!".format(
+                                            state.application_list.active_applications.remove(a)))
+                                state.application_list.get_app("home").activate()
                                 return
                         else:
-                            print("Closing all active applications")
-                            for a in state.application_list.active_applications:
-                                try:
-                                    a.deactivate()
-                                except COMMON_EXCEPTIONS:
-                                    print("The app {} failed to deactivate!".format(
-                                        state.application_list.active_applications.remove(a)))
-                            state.application_list.get_app("home").activate()
+                            print("Returning to Python OS.")
                             return
-                    else:
-                        print("Returning to Python OS.")
-                        return
+        finally:
+            # The page was drawn straight to the screen; let the compositor paint over all of it.
+            state.gui.invalidate()
 
     @staticmethod
     def error_recovery(message="Unknown", data=None):
@@ -4615,82 +7089,138 @@ class State(object):
         screen.blit(sf.render("Open Recovery Menu", 1, (200, 200, 200)), [20, 252])
         r_clock = pygame.time.Clock()
         pygame.display.flip()
-        while True:
-            r_clock.tick(10)
-            for evt in pygame.event.get():
-                if evt.type == pygame.QUIT or evt.type == pygame.KEYDOWN and evt.key == pygame.K_ESCAPE:
-                    try:
-                        state.exit()
-                    except COMMON_EXCEPTIONS:
-                        pygame.quit()
-                        exit()
-                if evt.type == pygame.MOUSEBUTTONDOWN:
-                    if evt.pos[1] >= 280:
-                        return
-                    elif evt.pos[1] >= 240:
-                        State.rescue()
-                        return
+        try:
+            while True:
+                r_clock.tick(10)
+                for evt in pygame.event.get():
+                    if evt.type == pygame.QUIT or evt.type == pygame.KEYDOWN and evt.key == pygame.K_ESCAPE:
+                        try:
+                            state.exit()
+                        except COMMON_EXCEPTIONS:
+                            pygame.quit()
+                            exit()
+                    if evt.type == pygame.MOUSEBUTTONDOWN:
+                        if evt.pos[1] >= 280:
+                            return
+                        elif evt.pos[1] >= 240:
+                            State.rescue()
+                            return
+        finally:
+            # The page was drawn straight to the screen; let the compositor paint over all of it.
+            state.gui.invalidate()
+
+    @staticmethod
+    def get_idle_timeout():
+        # type: () -> int
+        """Returns how long the main loop can sleep before the next frame, in milliseconds.
+        :return: 0 if there is input to process, something to repaint or a task to run.
+        """
+        if state.event_queue.ready or state.has_ui_calls or state.gui.full_refresh or len(state.gui.dirty_rects) > 0:
+            return 0
+        if state.compositor.dirty:
+            return 0
+        delay = GUI.IDLE_TIMEOUT
+        for pending in (state.thread_controller.get_run_delay(), state.timer_service.get_delay()):
+            if pending is not None and pending < delay:
+                delay = pending
+        return delay
 
     @staticmethod
     def main():
+        low_fps_marker = False
         while True:
             # Limit FPS
             state.gui.timer.tick(state.gui.update_interval)
-            state.gui.monitor_fps()
-            # Update event queue
+            # Sleep until something happens when there is nothing to do
+            if state.gui.on_demand and not pygame.event.peek():
+                timeout = State.get_idle_timeout()
+                if timeout > 0:
+                    state.gui.wait(timeout)
+            frame_start = pygame.time.get_ticks()
+            # Update event queue and route input before painting
             state.event_queue.check()
-            # Refresh main thread controller
+            State.dispatch_events()
+            # Apply the changes queued by other threads
+            State.run_ui_calls()
+            # Refresh main thread controller and scheduled repaints
             state.thread_controller.run()
+            state.timer_service.run()
             # Paint UI
-            if state.active_application is not None:
-                try:
-                    state.active_application.ui.render()
-                except COMMON_EXCEPTIONS:
-                    State.error_recovery("UI error.", "FPS: " + str(state.gui.update_interval))
-                    Application.full_close_current()
-            state.function_bar.render()
-            if state.keyboard is not None and state.keyboard.active:
-                state.keyboard.render(screen)
+            state.function_bar.update()
+            marker_rect = [state.gui.width - 5, state.gui.height - 5, 5, 5]
+            if low_fps_marker:
+                # Let the compositor paint over last frame's marker.
+                state.gui.invalidate(marker_rect)
+            try:
+                state.compositor.compose()
+            except COMMON_EXCEPTIONS:
+                State.error_recovery("UI error.", "FPS: " + str(state.gui.update_interval))
+                Application.full_close_current()
+            state.compositor.render(screen)
 
-            if state.gui.update_interval <= 20:
-                pygame.draw.rect(screen, (255, 0, 0), [state.gui.width - 5, state.gui.height - 5, 5, 5])
+            low_fps_marker = state.gui.update_interval <= 20
+            if low_fps_marker:
+                pygame.draw.rect(screen, (255, 0, 0), marker_rect)
+                state.gui.invalidate(marker_rect)
 
             state.gui.refresh()
-            # Check Events
-            latest_event = state.event_queue.latest_complete
-            if latest_event is not None:
-                clicked_child = None
-                if state.keyboard is not None and state.keyboard.active:
-                    if latest_event.pos[1] < state.keyboard.base_container.computed_position[1]:
-                        if state.active_application.ui.get_clicked_child(
-                                latest_event) == state.keyboard.text_entry_field:
-                            state.keyboard.text_entry_field.on_click()
-                        else:
-                            state.keyboard.deactivate()
-                        continue
-                    clicked_child = state.keyboard.base_container.get_clicked_child(latest_event)
-                    if clicked_child is None:
-                        clicked_child = state.active_application.ui.get_clicked_child(latest_event)
-                        if (state.keyboard.text_entry_field.computed_position == [0, 0] and
-                                state.keyboard.text_entry_field.check_click(latest_event)):
-                            clicked_child = state.keyboard.text_entry_field
+            state.gui.monitor_fps(pygame.time.get_ticks() - frame_start)
+
+    @staticmethod
+    def dispatch_events():
+        # type: () -> None
+        """Routes the complete events in the queue, oldest first, until it is drained or GUI.EVENT_BUDGET runs out.
+
+        Events left over are dispatched on the next frame, so a slow handler cannot keep the screen from updating.
+        """
+        deadline = pygame.time.get_ticks() + GUI.EVENT_BUDGET
+        while True:
+            event = state.event_queue.next_complete()
+            if event is None:
+                return
+            state.gui.record_input_latency(event)
+            State.dispatch_event(event)
+            if pygame.time.get_ticks() >= deadline:
+                return
+
+    @staticmethod
+    def dispatch_event(latest_event):
+        # type: (GUI.Event) -> None
+        """Routes an input event to the component under it.
+        :param latest_event: a complete event from the event queue.
+        """
+        clicked_child = None
+        if state.keyboard is not None and state.keyboard.active:
+            if latest_event.pos[1] < state.keyboard.base_container.computed_position[1]:
+                if state.active_application.ui.get_clicked_child(
+                        latest_event) == state.keyboard.text_entry_field:
+                    state.keyboard.text_entry_field.on_click()
+                else:
+                    state.keyboard.deactivate()
+                return
+            clicked_child = state.keyboard.base_container.get_clicked_child(latest_event)
+            if clicked_child is None:
+                clicked_child = state.active_application.ui.get_clicked_child(latest_event)
+                if (state.keyboard.text_entry_field.computed_position == [0, 0] and
+                        state.keyboard.text_entry_field.check_click(latest_event)):
+                    clicked_child = state.keyboard.text_entry_field
+        else:
+            if latest_event.pos[1] < state.gui.height - 40:
+                if state.active_application is not None:
+                    clicked_child = state.active_application.ui.get_clicked_child(latest_event)
+            else:
+                clicked_child = state.function_bar.container.get_clicked_child(latest_event)
+        if clicked_child is not None:
+            try:
+                if isinstance(latest_event, GUI.LongClickEvent):
+                    clicked_child.on_long_click()
                 else:
-                    if latest_event.pos[1] < state.gui.height - 40:
-                        if state.active_application is not None:
-                            clicked_child = state.active_application.ui.get_clicked_child(latest_event)
+                    if isinstance(latest_event, GUI.IntermediateUpdateEvent):
+                        clicked_child.on_intermediate_update()
                     else:
-                        clicked_child = state.function_bar.container.get_clicked_child(latest_event)
-                if clicked_child is not None:
-                    try:
-                        if isinstance(latest_event, GUI.LongClickEvent):
-                            clicked_child.on_long_click()
-                        else:
-                            if isinstance(latest_event, GUI.IntermediateUpdateEvent):
-                                clicked_child.on_intermediate_update()
-                            else:
-                                clicked_child.on_click()
-                    except COMMON_EXCEPTIONS:
-                        State.error_recovery("Event execution error", "Click event: " + str(latest_event))
+                        clicked_child.on_click()
+            except COMMON_EXCEPTIONS:
+                State.error_recovery("Event execution error", "Click event: " + str(latest_event))
 
     @staticmethod
     def state_shell():
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Checks AsyncLoop against a local stand-in server.
+
+Run from the repository root:
+
+    python -m unittest tests.test_async_loop
+"""
+
+import os
+import sys
+import time
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import pyos
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+# Every request waits this long on the server, so sequential requests would take CLIENTS times as long.
+DELAY = 0.2
+CLIENTS = 20
+
+
+class StandInServer(object):
+    """An echo server that answers each line after DELAY seconds."""
+
+    def __init__(self):
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0, backlog=CLIENTS)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        line = await reader.readline()
+        await asyncio.sleep(DELAY)
+        writer.write(b"echo " + line)
+        await writer.drain()
+        writer.close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def fetch(port, text):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(text.encode() + b"\n")
+    await writer.drain()
+    answer = await reader.readline()
+    writer.close()
+    return answer.decode().strip()
+
+
+async def wait_forever():
+    await asyncio.sleep(3600)
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class AsyncLoopTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pyos.__builtin__.state = pyos.State()
+
+    def setUp(self):
+        self.loop = pyos.AsyncLoop()
+        self.server = StandInServer()
+        self.loop.submit(self.server.start()).result(5)
+
+    def tearDown(self):
+        self.loop.submit(self.server.stop()).result(5)
+        self.loop.shutdown()
+
+    def dispatch_until(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            self.loop.dispatch_completed()
+            time.sleep(0.01)
+        self.loop.dispatch_completed()
+
+    def test_requests_run_concurrently(self):
+        answers = []
+        started = time.time()
+        for index in range(CLIENTS):
+            future = self.loop.submit(fetch(self.server.port, str(index)))
+            future.add_done_callback(lambda done: answers.append(done.returned_data))
+        self.dispatch_until(lambda: len(answers) == CLIENTS)
+        elapsed = time.time() - started
+        self.assertEqual(sorted(answers), sorted("echo {}".format(index) for index in range(CLIENTS)))
+        self.assertLess(elapsed, DELAY * CLIENTS / 2)
+        self.assertEqual(self.loop.stats()["finished"], CLIENTS + 1)
+
+    def test_errors_reach_the_future(self):
+        future = self.loop.submit(fetch(1, "refused"))
+        self.dispatch_until(future.done)
+        self.assertIsInstance(future.exception, OSError)
+        self.assertEqual(self.loop.stats()["failed"], 1)
+
+    def test_cancel_owner(self):
+        owner = object()
+        mine = self.loop.submit(wait_forever(), owner=owner)
+        other = self.loop.submit(fetch(self.server.port, "kept"))
+        self.loop.cancel_owner(owner)
+        self.dispatch_until(lambda: mine.done() and other.done())
+        self.assertTrue(mine.cancelled())
+        self.assertEqual(other.returned_data, "echo kept")
+
+
+if __name__ == "__main__":
+    unittest.main()